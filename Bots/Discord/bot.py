@@ -1,64 +1,34 @@
 import asyncio
-import logging
 import os
 import platform
+import time
+from typing import Optional
 
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
 from dotenv import load_dotenv
 
+from deletion_scheduler import DeletionScheduler
+from logging_setup import setup_logging
+from market_client import MarketClient
+from message_registry import MessageRegistry
+from metrics import Metrics
 from shared_functions import get_config
 
 intents = discord.Intents.default()
 intents.message_content = True
 
-class LoggingFormatter(logging.Formatter):
-    # Colors
-    black = "\x1b[30m"
-    red = "\x1b[31m"
-    green = "\x1b[32m"
-    yellow = "\x1b[33m"
-    blue = "\x1b[34m"
-    gray = "\x1b[38m"
-    # Styles
-    reset = "\x1b[0m"
-    bold = "\x1b[1m"
-
-    COLORS = {
-        logging.DEBUG: gray + bold,
-        logging.INFO: blue + bold,
-        logging.WARNING: yellow + bold,
-        logging.ERROR: red,
-        logging.CRITICAL: red + bold,
-    }
-
-    def format(self, record):
-        log_color = self.COLORS[record.levelno]
-        format = "(black){asctime}(reset) (levelcolor){levelname:<8}(reset) (green){name}(reset) {message}"
-        format = format.replace("(black)", self.black + self.bold)
-        format = format.replace("(reset)", self.reset)
-        format = format.replace("(levelcolor)", log_color)
-        format = format.replace("(green)", self.green + self.bold)
-        formatter = logging.Formatter(format, "%Y-%m-%d %H:%M:%S", style="{")
-        return formatter.format(record)
-
-
-logger = logging.getLogger("discord_bot")
-logger.setLevel(logging.INFO)
-
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(LoggingFormatter())
-# File handler
-file_handler = logging.FileHandler(filename="discord.log", encoding="utf-8", mode="w")
-file_handler_formatter = logging.Formatter(
-    "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
-)
-file_handler.setFormatter(file_handler_formatter)
-
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+logger, log_listener = setup_logging("discord_bot", filename="discord.log")
+
+
+class CommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        #runs before every app command, so latency is measured on our clock from when the command starts,
+        #not from discord's created_at (clock skew, gateway delay)
+        interaction.extras["started"] = time.perf_counter()
+        return True
 
 
 class DiscordBot(commands.Bot):
@@ -67,25 +37,60 @@ class DiscordBot(commands.Bot):
             command_prefix=commands.when_mentioned_or(get_config("prefix")),
             intents=intents,
             help_command=None,
+            tree_cls=CommandTree,
         )
-        cembed_id = []
         self.logger = logger
         self.prefix = get_config("prefix")
-        self.cembed_id = cembed_id
+        #shared by every cog that reads the StockPiece backend, so they share its connection pool and cache
+        self.market = MarketClient(get_config("api_base_url"), logger)
+        self.metrics = Metrics()
+        self.cogs_version = 0  #bumped on every cog add/remove (so also load/unload/reload), for caches built from bot.cogs
+        #embeds from /create_embed, kept out of autodelete and persisted across restarts
+        self.cembed_id = MessageRegistry(
+            max_size=10000,
+            path=f"{os.path.realpath(os.path.dirname(__file__))}/tracked_messages.json",
+        )
+        #batches autodeletes per channel; tracked embeds are skipped when their batch is flushed
+        self.deletion_scheduler = DeletionScheduler(lambda message_id: message_id in self.cembed_id, logger)
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs) -> None:
+        await super().add_cog(cog, **kwargs)
+        self.cogs_version += 1
+
+    async def remove_cog(self, name: str, /, **kwargs):
+        cog = await super().remove_cog(name, **kwargs)
+        self.cogs_version += 1
+        return cog
+
+    async def load_cog(self, extension: str) -> Optional[float]:
+        #seconds the extension took to load, None if it failed
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f"cogs.{extension}")
+        except Exception as e:
+            exception = f"{type(e).__name__}: {e}"
+            self.logger.error(
+                f"Failed to load extension {extension}\n{exception}"
+            )
+            return None
+        return time.perf_counter() - start
 
     async def load_cogs(self) -> None:
-        for file in os.listdir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs"):
-            if file.endswith(".py"):
-                extension = file[:-3]
-                try:
-                    await self.load_extension(f"cogs.{extension}")
-                    self.logger.info(f"Loaded extension '{extension}'")
-                except Exception as e:
-                    exception = f"{type(e).__name__}: {e}"
-                    self.logger.error(
-                        f"Failed to load extension {extension}\n{exception}"
-                    )
-    
+        #cogs don't depend on each other, so their setup() coroutines run concurrently instead of one after another
+        start = time.perf_counter()
+        extensions = sorted(
+            entry.name[:-3] for entry in os.scandir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs")
+            if entry.is_file() and entry.name.endswith(".py")
+        )
+        timings = await asyncio.gather(*(self.load_cog(extension) for extension in extensions))
+        total = time.perf_counter() - start
+
+        for extension, elapsed in sorted(zip(extensions, timings), key=lambda x: -(x[1] or 0)):
+            if elapsed is not None:
+                self.logger.info(f"Loaded extension '{extension}' in {elapsed * 1000:.1f}ms")
+        loaded = sum(elapsed is not None for elapsed in timings)
+        self.logger.info(f"Loaded {loaded}/{len(extensions)} extensions in {total * 1000:.1f}ms")
+
     async def setup_hook(self) -> None:
 
         self.logger.info(f"Logged in as {self.user.name}")
@@ -95,9 +100,42 @@ class DiscordBot(commands.Bot):
             f"Running on: {platform.system()} {platform.release()} ({os.name})"
         )
         self.logger.info("-------------------")
+        await self.start_metrics()
+        self.save_tracked_messages.start()
         await self.load_cogs()
         #await self.sync_cmds()
 
+    async def start_metrics(self) -> None:
+        port = get_config("metrics_port")
+        if not port:
+            return
+        #queue depths and gateway latency are read when scraped, nothing to update on the hot paths
+        self.metrics.gauge("discord_bot_gateway_latency_seconds", "Heartbeat latency to the discord gateway.", lambda: self.latency)
+        self.metrics.gauge("discord_bot_deletion_queue_depth", "Messages waiting in the autodelete scheduler.", lambda: len(self.deletion_scheduler))
+        self.metrics.gauge("discord_bot_log_queue_depth", "Log records waiting for the logging thread.", lambda: log_listener.queue.qsize())
+        self.metrics.gauge("discord_bot_market_requests_in_flight", "Upstream market API requests in flight.", lambda: len(self.market.inflight))
+        try:
+            await self.metrics.serve(port=port)
+            self.logger.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            self.logger.error(f"Failed to start the metrics endpoint on port {port}: {e}")
+
+    @tasks.loop(seconds=30)
+    async def save_tracked_messages(self) -> None:
+        #batched writes instead of rewriting the whole registry on every /create_embed
+        self.cembed_id.save()
+
+    async def invoke(self, context: Context) -> None:
+        start = time.perf_counter()
+        await super().invoke(context)
+        if context.command is not None:
+            self.metrics.command_latency.observe(time.perf_counter() - start, context.command.qualified_name, "prefix")
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command) -> None:
+        started = interaction.extras.get("started")
+        if started is not None:
+            self.metrics.command_latency.observe(time.perf_counter() - started, command.qualified_name, "app")
+
     async def sync_cmds(self) -> None:
         try:
             synced = await self.tree.sync()
@@ -118,6 +156,7 @@ class DiscordBot(commands.Bot):
             self.logger.debug(f"Executed {executed_command} command by {context.author} (ID: {context.author.id}) in DMs")
 
     async def on_command_error(self, context: Context, error) -> None: #TODO eventually will need to move this whole func to exception-handler (change file name to camelcase also maybe)
+        self.metrics.command_errors.inc(context.command.qualified_name if context.command else "unknown", type(getattr(error, "original", error)).__name__)
         if isinstance(error, commands.CommandOnCooldown):
             minutes, seconds = divmod(error.retry_after, 60)
             hours, minutes = divmod(minutes, 60)
@@ -180,20 +219,31 @@ class DiscordBot(commands.Bot):
 
     
     async def on_message(self, message: discord.Message) -> None:
+        start = time.perf_counter()
+        try:
+            await self.handle_message(message)
+        finally:
+            self.metrics.event_latency.observe(time.perf_counter() - start, "on_message")
+
+    async def handle_message(self, message: discord.Message) -> None:
         if message.author.id == self.user.id:
-            await asyncio.sleep(2) #allow msg some time to be sent and logged before deletion, to see if it was an embed cmd created msg.
-            if message.id not in self.cembed_id:
-                try:
-                    await message.delete()
-                except discord.errors.NotFound:
-                    self.logger.debug(f"Tried to delete a message that no longer exists: {message.id}") #weird error where tries to delete nonexistent/ephermal msg
-                except Exception as e:
-                    self.logger.debug(f"Error in on_message: {e}")
+            #deleted after the scheduler's delay, which gives /create_embed time to register the msg as tracked;
+            #DMs (price alerts) are left alone
+            if message.guild is not None:
+                self.deletion_scheduler.schedule(message)
         elif message.channel.id == get_config("autodelete_channel") and message.id not in self.cembed_id:
-            await message.delete()
+            self.deletion_scheduler.schedule(message, delay=0)
 
         await self.process_commands(message)
 
+    async def close(self) -> None:
+        self.save_tracked_messages.cancel()
+        self.cembed_id.save()
+        await self.deletion_scheduler.close()
+        await self.market.close()
+        await self.metrics.close()
+        await super().close()
+
 load_dotenv()
 
 bot = DiscordBot()
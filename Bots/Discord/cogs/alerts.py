@@ -0,0 +1,119 @@
+import os
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from price_alerts import AlertIndex, DMDispatcher
+
+
+class Alerts(commands.Cog, name="alerts"):
+    alert = app_commands.Group(name="alert", description="Get a DM when a stock's price crosses a value.")
+
+    def __init__(self, bot) -> None:
+        self.bot = bot
+        self.index = AlertIndex(path=f"{os.path.realpath(os.path.dirname(os.path.dirname(__file__)))}/price_alerts.json")
+        self.dispatcher = DMDispatcher(bot, on_delivered=self.index.delivered)
+
+    async def cog_load(self) -> None:
+        self.dispatcher.start()
+        self.dispatcher.dispatch(self.index.pending_alerts())  #triggered before the last shutdown but never delivered
+        self.bot.metrics.gauge("discord_bot_alert_dm_queue_depth", "Users waiting for a price alert DM.", self.dispatcher.queue.qsize)
+        self.check_prices.start()
+        self.save_alerts.start()
+
+    async def cog_unload(self) -> None:
+        self.check_prices.cancel()
+        self.save_alerts.cancel()
+        await self.dispatcher.stop()
+        self.bot.metrics.remove("discord_bot_alert_dm_queue_depth")
+        self.index.save()
+
+    @tasks.loop(minutes=2)
+    async def check_prices(self) -> None:
+        #statistics are cached by the market client, so this shares requests with /price
+        try:
+            statistics = await self.bot.market.statistics()
+        except Exception as e:
+            self.bot.logger.debug(f"Price alert check skipped, market API unavailable: {e}")
+            return
+        if not statistics:
+            return
+        latest = max(int(chapter) for chapter in statistics)
+        if self.index.last_chapter is None:
+            #first run: only chapters after now should trigger, not ones released before the alerts existed
+            self.index.last_chapter = latest
+            self.index.dirty = True
+            return
+        for chapter in sorted(int(chapter) for chapter in statistics):
+            if chapter <= self.index.last_chapter:
+                continue
+            changes = {update["name"]: (update.get("oldValue"), update["newValue"]) for update in statistics[str(chapter)]}
+            triggered = self.index.check(changes)
+            self.dispatcher.dispatch(triggered)
+            self.bot.logger.info(f"Chapter {chapter} prices triggered {len(triggered)} price alerts")
+            self.index.last_chapter = chapter
+            self.index.dirty = True
+
+    @check_prices.before_loop
+    async def before_check_prices(self) -> None:
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=30)
+    async def save_alerts(self) -> None:
+        #batched writes instead of rewriting the whole store on every subscribe
+        self.index.save()
+
+    @alert.command(name="add", description="Get a DM when a stock crosses a price.")
+    @app_commands.describe(stock="Character stock", price="Price in Berries")
+    async def add(self, interaction: discord.Interaction, stock: str, price: app_commands.Range[float, 0]) -> None:
+        name = await self.resolve_stock(interaction, stock)
+        if name is None:
+            await self.reply(interaction, f"No stock named `{stock}` found.")
+        elif self.index.add(interaction.user.id, name, price):
+            await self.reply(interaction, f"I'll DM you when **{name}** crosses {price:,.2f} Berries.")
+        else:
+            await self.reply(interaction, f"You already have that alert, or the maximum of {self.index.max_per_user} alerts.")
+
+    @alert.command(name="remove", description="Remove one of your price alerts.")
+    @app_commands.describe(stock="Character stock", price="Price in Berries")
+    async def remove(self, interaction: discord.Interaction, stock: str, price: float) -> None:
+        name = await self.resolve_stock(interaction, stock) or stock  #still removable after a stock leaves the chapter data
+        if self.index.remove(interaction.user.id, name, price):
+            await self.reply(interaction, f"Removed your **{name}** alert at {price:,.2f}.")
+        else:
+            await self.reply(interaction, "No matching alert found.")
+
+    @alert.command(name="list", description="List your price alerts.")
+    async def list_alerts(self, interaction: discord.Interaction) -> None:
+        alerts = self.index.alerts_for(interaction.user.id)
+        lines = [f"**{stock}** at {threshold:,.2f}" for stock, threshold in sorted(alerts)]
+        embed = discord.Embed(title="Your price alerts", description="\n".join(lines) or "You have no price alerts.", color=0xEFBF04)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @add.autocomplete("stock")
+    @remove.autocomplete("stock")
+    async def stock_autocomplete(self, interaction: discord.Interaction, current: str):
+        if not self.bot.market.is_fresh("/market/statistics/all"):
+            return []
+        current = current.lower()
+        prices = await self.bot.market.prices()
+        return [app_commands.Choice(name=name, value=name) for name in sorted(prices) if current in name.lower()][:25]
+
+    async def resolve_stock(self, interaction: discord.Interaction, stock: str):
+        #alerts are stored under the name chapter data uses, so "luffy" has to become "Luffy" before it's indexed;
+        #a cache miss might not make the 3 second interaction deadline, so defer first
+        if not self.bot.market.is_fresh("/market/statistics/all"):
+            await interaction.response.defer(ephemeral=True)
+        prices = await self.bot.market.prices()
+        return next((name for name in prices if name.lower() == stock.lower()), None)
+
+    async def reply(self, interaction: discord.Interaction, content: str) -> None:
+        if interaction.response.is_done():
+            await interaction.followup.send(content, ephemeral=True)
+        else:
+            await interaction.response.send_message(content, ephemeral=True)
+
+
+async def setup(bot) -> None:
+    await bot.add_cog(Alerts(bot))
@@ -1,6 +1,11 @@
+import asyncio
+
+import aiohttp
 import discord
 from discord.ext import commands
 
+from market_client import MarketAPIError
+
 class ExceptionHandler(commands.Cog, name="ErrorHandler"):
     def __init__(self, bot) -> None:
         self.bot = bot
@@ -8,6 +13,9 @@ class ExceptionHandler(commands.Cog, name="ErrorHandler"):
         bot.tree.error(coro = self.__dispatch_to_app_command_handler)
 
     async def __dispatch_to_app_command_handler(self, interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+        self.bot.metrics.command_errors.inc(
+            interaction.command.qualified_name if interaction.command else "unknown", type(getattr(error, "original", error)).__name__
+        )
         self.bot.dispatch("app_command_error", interaction, error)
 
     @commands.Cog.listener("on_app_command_error")        
@@ -70,6 +78,18 @@ class ExceptionHandler(commands.Cog, name="ErrorHandler"):
                 color=0xE02B2B,
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
+        elif isinstance(error, discord.app_commands.CommandInvokeError) and isinstance(error.original, (MarketAPIError, aiohttp.ClientError, asyncio.TimeoutError)):
+            self.logger.warning(f"Market API unavailable for {interaction.command.name if interaction.command else 'unknown'} command. Error: {error.original}")
+            embed = discord.Embed(
+                title="Error!",
+                description="Couldn't reach the StockPiece market right now, please try again in a bit.",
+                color=0xE02B2B,
+            )
+            #market commands may have deferred before the request failed
+            if interaction.response.is_done():
+                await interaction.followup.send(embed=embed, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
             raise error
         
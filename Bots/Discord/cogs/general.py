@@ -4,18 +4,32 @@ from discord.ext import commands
 from discord.ext.commands import Context
 from shared_functions import get_config
 
+#discord embed limits
+FIELD_LIMIT = 1024
+FIELDS_PER_EMBED = 25
+EMBED_LIMIT = 6000
+
 class General(commands.Cog, name="general"):
     def __init__(self, bot) -> None:
         self.bot = bot
-        
+        self.help_cache = None  #(cache key, [pages])
+
     @commands.hybrid_command(
         name="help", description="List all commands the bot has loaded."
     )
     async def help(self, context: Context) -> None:
-        prefix = self.bot.prefix
-        embed = discord.Embed(
-            title="Help", description="List of available commands:", color=0xBEBEFE
-        )
+        for embed in self.help_pages():
+            await context.send(embed=embed)
+
+    def help_pages(self) -> list:
+        #rendered once and reused until a cog is added/removed (bot.cogs_version) or the prefix/footer config changes
+        key = (self.bot.cogs_version, self.bot.prefix, get_config("website_link"))
+        if self.help_cache is None or self.help_cache[0] != key:
+            self.help_cache = (key, self.render_help(*key[1:]))
+        return self.help_cache[1]
+
+    def render_help(self, prefix: str, footer: str) -> list:
+        fields = []
         for i in self.bot.cogs:
             if i == "owners":
                 continue
@@ -25,13 +39,40 @@ class General(commands.Cog, name="general"):
                 data = []
                 for command in commands:
                     description = command.description.partition("\n")[0]
-                    data.append(f"{prefix}{command.name} - {description}")
-                help_text = "\n".join(data)
+                    data.append(f"{prefix}{command.name} - {description}"[:FIELD_LIMIT - 7])
+                #split into as many fields as needed to keep each under the field value limit
+                chunk = []
+                for line in data:
+                    if chunk and len("\n".join(chunk + [line])) + 6 > FIELD_LIMIT:
+                        fields.append((i.capitalize(), "\n".join(chunk)))
+                        chunk = []
+                    chunk.append(line)
+                if chunk:
+                    fields.append((i.capitalize(), "\n".join(chunk)))
+
+        #pack fields into pages under the per-embed field count and total size limits
+        pages = [[]]
+        size = len("Help") + len("List of available commands:") + len(footer) + 10  #+10 for the page number
+        for name, help_text in fields:
+            field_size = len(name) + len(help_text) + 6
+            if pages[-1] and (len(pages[-1]) == FIELDS_PER_EMBED or size + field_size > EMBED_LIMIT):
+                pages.append([])
+                size = len("Help") + len("List of available commands:") + len(footer) + 10
+            pages[-1].append((name, help_text))
+            size += field_size
+
+        embeds = []
+        for n, page in enumerate(pages, 1):
+            embed = discord.Embed(
+                title="Help" if len(pages) == 1 else f"Help ({n}/{len(pages)})", description="List of available commands:", color=0xBEBEFE
+            )
+            for name, help_text in page:
                 embed.add_field(
-                    name=i.capitalize(), value=f"```{help_text}```", inline=False
+                    name=name, value=f"```{help_text}```", inline=False
                 )
-        embed.set_footer(text=get_config("website_link"))
-        await context.send(embed=embed)
+            embed.set_footer(text=footer)
+            embeds.append(embed)
+        return embeds
 
     @commands.hybrid_command(
         name="invite",
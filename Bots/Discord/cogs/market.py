@@ -0,0 +1,98 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from shared_functions import get_config
+
+ORDER_CHOICES = [
+    app_commands.Choice(name="Total value", value="totalValue"),
+    app_commands.Choice(name="Stock value", value="stockValue"),
+    app_commands.Choice(name="Account value", value="accountValue"),
+]
+
+
+class Market(commands.Cog, name="market"):
+    #all data comes through bot.market (market_client.MarketClient), which caches and coalesces upstream requests
+    def __init__(self, bot) -> None:
+        self.bot = bot
+
+    async def defer_if_slow(self, interaction: discord.Interaction, *paths, params: dict = None) -> None:
+        #cached answers go out straight away; only a cache miss might not make the 3 second interaction deadline
+        if not all(self.bot.market.is_fresh(path, params) for path in paths):
+            await interaction.response.defer()
+
+    async def send(self, interaction: discord.Interaction, embed: discord.Embed) -> None:
+        embed.set_footer(text=get_config("website_link"))
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed)
+        else:
+            await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(
+        name="price",
+        description="Show a character stock's current price and last chapter change.",
+    )
+    @app_commands.describe(stock="Character stock")
+    async def price(self, interaction: discord.Interaction, stock: str) -> None:
+        await self.defer_if_slow(interaction, "/market/statistics/all")
+        prices = await self.bot.market.prices()
+        name = next((name for name in prices if name.lower() == stock.lower()), None)
+        if name is None:
+            embed = discord.Embed(description=f"No stock named `{stock}` found.", color=0xE02B2B)
+            await self.send(interaction, embed)
+            return
+
+        old_value, new_value = prices[name]
+        embed = discord.Embed(title=name, color=0xEFBF04)
+        embed.add_field(name="Price", value=f"{new_value:,.2f} Berries")
+        if old_value:
+            change = (new_value - old_value) / old_value * 100
+            embed.add_field(name="Last chapter", value=f"{'+' if change >= 0 else ''}{change:.2f}% (from {old_value:,.2f})")
+        await self.send(interaction, embed)
+
+    @price.autocomplete("stock")
+    async def price_autocomplete(self, interaction: discord.Interaction, current: str):
+        if not self.bot.market.is_fresh("/market/statistics/all"):
+            return []  #autocomplete has no defer, don't risk the deadline on an upstream request
+        current = current.lower()
+        prices = await self.bot.market.prices()
+        return [app_commands.Choice(name=name, value=name) for name in sorted(prices) if current in name.lower()][:25]
+
+    @app_commands.command(
+        name="market",
+        description="Show whether the market is open and the latest chapter.",
+    )
+    async def market(self, interaction: discord.Interaction) -> None:
+        await self.defer_if_slow(interaction, "/market/status", "/market/chapters/latest")
+        status = await self.bot.market.market_status()
+        chapter = await self.bot.market.latest_chapter()
+        embed = discord.Embed(
+            title=f"Market {status}",
+            description=f"Latest chapter: **{chapter['chapter']}**",
+            color=0x57F287 if status == "open" else 0xE02B2B,
+        )
+        if status == "open" and chapter.get("windowEndDate"):
+            end = discord.utils.parse_time(chapter["windowEndDate"].replace("Z", "+00:00"))
+            embed.add_field(name="Trading closes", value=discord.utils.format_dt(end, "R"))
+        await self.send(interaction, embed)
+
+    @app_commands.command(
+        name="leaderboard",
+        description="Show the top StockPiece traders.",
+    )
+    @app_commands.describe(order_by="What to rank by")
+    @app_commands.choices(order_by=ORDER_CHOICES)
+    async def leaderboard(self, interaction: discord.Interaction, order_by: app_commands.Choice[str] = None) -> None:
+        order = order_by.value if order_by else "totalValue"
+        await self.defer_if_slow(interaction, "/user/leaderboard", params={"orderBy": order})
+        users = await self.bot.market.leaderboard(order)
+        lines = [f"**{rank}.** {user['name']} - {user[order]:,.2f}" for rank, user in enumerate(users[:10], 1)]
+        embed = discord.Embed(
+            title=f"Leaderboard ({next(c.name for c in ORDER_CHOICES if c.value == order)})",
+            description="\n".join(lines) or "No traders yet.",
+            color=0xEFBF04,
+        )
+        await self.send(interaction, embed)
+
+
+async def setup(bot) -> None:
+    await bot.add_cog(Market(bot))
@@ -2,10 +2,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
-import datetime
+import bisect
+import os
 import re
+import time
+from embed_templates import EmbedError, EmbedTemplates, broadcast, build_embed
 from shared_functions import check_admin,check_guild,get_config
 
+CHANNEL_ID_REGEX = re.compile(r"\d{15,20}")  #bare ids and the ids inside <#...> mentions
+
 
 
 
@@ -56,149 +61,200 @@ class EmbedForm(discord.ui.Modal, title="Embed creation form"):
         self.stop()
 
 
+def is_self_assignable(role: discord.Role, breakoff_role: discord.Role) -> bool:
+    return (
+        role.position < breakoff_role.position
+        and not role.hoist
+        and role.is_assignable()
+        and (role.permissions.value & discord.Permissions.elevated().value) == 0
+    )
+
+
+class RoleIndex:
+    #per-guild list of roles members may self-assign for autocomplete, rebuilt lazily after role events instead of on
+    #every keystroke; is_assignable() also depends on the bot's own top role, whose changes only arrive with the members
+    #intent (not enabled), so an index is also rebuilt once it's `ttl` seconds old. /role itself checks the live role.
+    def __init__(self, breakoff_role_id: int = None, ttl: float = 300) -> None:
+        self.breakoff_role_id = breakoff_role_id  #None reads role_breakoff_id from the config on each rebuild
+        self.ttl = ttl
+        self.guilds = {}  #guild id -> (sorted [(lowercase name, role id)], built at)
+
+    def invalidate(self, guild_id: int) -> None:
+        self.guilds.pop(guild_id, None)
+
+    def breakoff_role(self, guild: discord.Guild):
+        return guild.get_role(self.breakoff_role_id if self.breakoff_role_id is not None else get_config("role_breakoff_id"))
+
+    def _build(self, guild: discord.Guild):
+        breakoff_role = self.breakoff_role(guild)
+        if not breakoff_role:
+            entries = []
+        else:
+            entries = sorted((role.name.lower(), role.id) for role in guild.roles if is_self_assignable(role, breakoff_role))
+        self.guilds[guild.id] = (entries, time.monotonic())
+        return self.guilds[guild.id]
+
+    def _get(self, guild: discord.Guild):
+        cached = self.guilds.get(guild.id)
+        if cached is None or time.monotonic() - cached[1] > self.ttl:
+            cached = self._build(guild)
+        return cached
+
+    def search(self, guild: discord.Guild, current: str, limit: int = 25) -> list:
+        entries, _ = self._get(guild)
+        query = current.strip('@').lower()
+        #prefix matches first (binary search on the sorted names), then the other substring matches
+        start = bisect.bisect_left(entries, (query,))
+        matches = []
+        for name, role_id in entries[start:]:
+            if not name.startswith(query) or len(matches) == limit:
+                break
+            matches.append(role_id)
+        if len(matches) < limit and query:
+            prefixed = set(matches)
+            for name, role_id in entries:
+                if query in name and role_id not in prefixed:
+                    matches.append(role_id)
+                    if len(matches) == limit:
+                        break
+        return matches
+
+
+role_index = RoleIndex()
+
+
 class RoleTransformer(app_commands.Transformer):
-    def __init__(self):
-        self.breakoff_role_id = get_config("role_breakoff_id")
-    
+    #only resolves the role, None when there's no such role; /role decides whether it may be assigned
     async def transform(self, interaction: discord.Interaction, role_id: str) -> discord.Role:
-        role = discord.utils.get(interaction.guild.roles, id=int(role_id))
-        breakoff_role = discord.utils.get(interaction.guild.roles, id=self.breakoff_role_id)
-        
-        if not role or not breakoff_role:
-            raise app_commands.TransformerError("Invalid role.")
-        
-        if (role.position >= breakoff_role.position or role.hoist or not role.is_assignable()):
-            raise app_commands.TransformerError("You cannot assign this role.")
-        
-        return role
-    
+        try:
+            return interaction.guild.get_role(int(role_id))
+        except ValueError:
+            return None
+
     async def autocomplete(self, interaction, current: str):
-        breakoff_role = discord.utils.get(interaction.guild.roles, id=self.breakoff_role_id)
-        
-        if not breakoff_role:
-            return []
-        
-        filtered_roles = [
-            role for role in interaction.guild.roles
-            if role.position < breakoff_role.position
-            and not role.hoist
-            and role.is_assignable()
-            and current.strip('@').lower() in role.name.lower() 
-            and (role.permissions.value & discord.Permissions.elevated().value)==0
-        ]
-        
-        return [app_commands.Choice(name='@'+role.name, value=str(role.id)) for role in filtered_roles[:25]]
+        choices = []
+        for role_id in role_index.search(interaction.guild, current):
+            role = interaction.guild.get_role(role_id)
+            if role:
+                choices.append(app_commands.Choice(name='@'+role.name, value=str(role.id)))
+        return choices
 
 
 
 class Owners(commands.Cog, name="Owner Commands"):
     def __init__(self, bot) -> None:
         self.bot = bot
+        self.templates = EmbedTemplates(f"{os.path.realpath(os.path.dirname(os.path.dirname(__file__)))}/embed_templates.json")
+
+    #any role change can move positions/names/permissions, so drop that guild's index and rebuild on next use
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        role_index.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        role_index.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        role_index.invalidate(role.guild.id)
 
     @app_commands.command(
         name="create_embed",
         description="Create an embed (Main stockpiece server admin-only).",
     )
     @app_commands.check(check_admin)
-    @app_commands.guilds(discord.Object(id=get_config("main_guild_id")))
-    async def create_embed(self, interaction: discord.Interaction ,channel: discord.TextChannel, colorx: str="") -> None:
+    @app_commands.describe(save_as="Also save the embed as a template with this id")
+    async def create_embed(self, interaction: discord.Interaction ,channel: discord.TextChannel, colorx: str="", save_as: str="") -> None:
         embed_form = EmbedForm()
         await interaction.response.send_modal(embed_form)
         await embed_form.wait()
+        #the latency metric starts when the form is submitted, time the admin spends filling it in isn't command time
+        interaction.extras["started"] = time.perf_counter()
         interaction = embed_form.interaction
 
-        # Parse the color, default is lime green
-        color = discord.Color(int("EFBF04", 16))
-        if colorx != "":
-            try:
-                color = discord.Color(int(colorx.strip("#"), 16))
-            except ValueError:
-                await interaction.response.send_message("Invalid color format. Use hex format like #7289DA.", ephemeral=True)
-                return
-        embed = discord.Embed(
-            description=str(embed_form.desc) or None,
-            color=color
-        )
-
-        regex = re.compile(
-                r'^(?:http|ftp)s?://' # http:// or https://
-                r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|' #domain...
-                r'localhost|' #localhost...
-                r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})' # ...or ip
-                r'(?::\d+)?' # optional port
-                r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-
-        title_parts = str(embed_form.titlex).split("||")
-        embed.title = title_parts[0].strip() if title_parts[0] else None
-        if len(title_parts) > 1:
-            if re.match(regex, title_parts[1].strip()) is not None:
-                embed.url = title_parts[1].strip()
-            else:
-                await interaction.response.send_message("Invalid Title Url!", ephemeral=True)
-                return
+        form = {
+            "title": str(embed_form.titlex),
+            "desc": str(embed_form.desc),
+            "media": str(embed_form.media),
+            "footer_timestamp": str(embed_form.footer_timestamp),
+            "fields": str(embed_form.fields),
+            "color": colorx,
+        }
+        try:
+            embed = self.templates.save(save_as, form) if save_as else build_embed(**form)
+        except EmbedError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        m = await channel.send(embed=embed)
+        self.bot.cembed_id.add(m.id)
+        await interaction.response.send_message(f"Embed created{f' and saved as `{save_as.lower()}`' if save_as else ''}!", ephemeral=True)
 
-        media_parts = str(embed_form.media).split("||")
-        if len(media_parts) >= 1 and media_parts[0].strip():
-            if re.match(regex, media_parts[0].strip()) is not None:
-                embed.set_image(url=media_parts[0].strip())
-            else:
-                await interaction.response.send_message("Invalid Image Url!", ephemeral=True)
-                return
-            
-        if len(media_parts) == 2 and media_parts[1].strip():
-            if re.match(regex, media_parts[1].strip()) is not None:
-                embed.set_thumbnail(url=media_parts[1].strip())
+    @app_commands.command(
+        name="broadcast_embed",
+        description="Send a saved embed template to many channels (Main stockpiece server admin-only).",
+    )
+    @app_commands.check(check_admin)
+    @app_commands.describe(template="Template id", channels="Channel mentions or ids, separated by spaces")
+    async def broadcast_embed(self, interaction: discord.Interaction, template: str, channels: str) -> None:
+        if template not in self.templates:
+            await interaction.response.send_message(f"No template `{template}`.", ephemeral=True)
+            return
+        targets = []
+        rejected = []  #unknown, not messageable, or in another guild than the one the command was used in
+        for channel_id in dict.fromkeys(int(i) for i in CHANNEL_ID_REGEX.findall(channels)):
+            channel = self.bot.get_channel(channel_id)
+            if isinstance(channel, discord.abc.Messageable) and getattr(channel, "guild", None) == interaction.guild:
+                targets.append(channel)
             else:
-                await interaction.response.send_message("Invalid Thumbnail Url!", ephemeral=True)
-                return
-
-        footer_parts = str(embed_form.footer_timestamp).split("||")
-        if len(footer_parts) >= 1 and footer_parts[0].strip():
-            embed.set_footer(text=footer_parts[0].strip())
-
-        if len(footer_parts) == 2:
-            try:
-                timestamp = datetime.datetime.strptime(footer_parts[1].strip(), "%Y-%m-%d %H:%M:%S")
-                embed.timestamp = timestamp
-            except ValueError:
-                await interaction.response.send_message("Invalid timestamp format. Use **YYYY-MM-DD HH:MM:SS**.", ephemeral=True)
-                return
-
-        if str(embed_form.fields):
-            field_lines = str(embed_form.fields).split("\n")
-            if len(field_lines) > 25:
-                await interaction.response.send_message("You can only have up to 25 fields.", ephemeral=True)
-                return
-
-            for line in field_lines:
-                parts = line.split("||")
-                if len(parts) < 2:
-                    continue
-                name = parts[0].strip()
-                value = parts[1].strip()
-                inline = parts[2].strip().lower() == "true" if len(parts) == 3 else False
-                embed.add_field(name=name, value=value, inline=inline)
-        if embed.description == None and embed.title == None and embed.image == None:
-            await interaction.response.send_message("No title, description or image given!", ephemeral=True)
+                rejected.append(channel_id)
+        rejected_line = f"Skipped channels not in this server: {', '.join(f'`{i}`' for i in rejected)}" if rejected else ""
+        if not targets:
+            await interaction.response.send_message(f"No valid channels given.\n{rejected_line}".strip(), ephemeral=True)
             return
-        m = await channel.send(embed=embed)
-        print(m.id)
-        self.bot.cembed_id.append(m.id)
-        await interaction.response.send_message("Embed created!", ephemeral=True)
-        
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        #tracked as each send returns, a long broadcast would otherwise lose its first messages to autodelete
+        results = await broadcast(targets, self.templates.get(template), on_sent=lambda message: self.bot.cembed_id.add(message.id))
+        lines = [rejected_line] if rejected_line else []  #first, so truncating a long report can't hide it
+        for channel, message, seconds, error in results:
+            if message is not None:
+                lines.append(f"\u2705 {channel.mention} {seconds * 1000:.0f}ms")
+            else:
+                lines.append(f"\u274c {channel.mention} {seconds * 1000:.0f}ms - {type(error).__name__}")
+        sent = sum(message is not None for _, message, _, _ in results)
+        report = discord.Embed(title=f"Sent `{template.lower()}` to {sent}/{len(results)} channels", description="\n".join(lines)[:4096], color=0xEFBF04)
+        await interaction.followup.send(embed=report, ephemeral=True)
+
+    @app_commands.command(
+        name="delete_embed_template",
+        description="Delete a saved embed template (Main stockpiece server admin-only).",
+    )
+    @app_commands.check(check_admin)
+    async def delete_embed_template(self, interaction: discord.Interaction, template: str) -> None:
+        if self.templates.delete(template):
+            await interaction.response.send_message(f"Deleted template `{template.lower()}`.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"No template `{template}`.", ephemeral=True)
+
+    @broadcast_embed.autocomplete("template")
+    @delete_embed_template.autocomplete("template")
+    async def template_autocomplete(self, interaction: discord.Interaction, current: str):
+        current = current.lower()
+        return [app_commands.Choice(name=t, value=t) for t in self.templates.ids() if current in t][:25]
+
     @app_commands.command(
         name="role",
         description="Add/Remove role.",
     )
     @app_commands.check(check_guild)
-    @app_commands.guilds(discord.Object(id=get_config("main_guild_id")))
     @app_commands.describe(role="Role you want to add/remove")
     async def role(self, interaction: discord.Interaction,role: app_commands.Transform[discord.Role, RoleTransformer()]):
         if not role:
             await interaction.response.send_message("No matching roles found.", ephemeral=True)
             return
-        breakoff_role = discord.utils.get(interaction.guild.roles, id=get_config("role_breakoff_id"))
-        if role.position < breakoff_role.position and not role.hoist and role.is_assignable() and (role.permissions.value & discord.Permissions.elevated().value) !=0:
+        breakoff_role = role_index.breakoff_role(interaction.guild)
+        if not breakoff_role or not is_self_assignable(role, breakoff_role):
             await interaction.response.send_message(f"Not allowed to add this role!",ephemeral=True)
             return
         elif role in interaction.user.roles:
@@ -209,4 +265,5 @@ class Owners(commands.Cog, name="Owner Commands"):
             await interaction.response.send_message(f"Adding role {role.name}.",ephemeral=True)
         
 async def setup(bot) -> None:
-    await bot.add_cog(Owners(bot))
+    #the guild is resolved here rather than in decorators at import time; add_cog applies it to every command in the cog
+    await bot.add_cog(Owners(bot), guild=discord.Object(id=get_config("main_guild_id")))
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Callable, Dict
+
+import discord
+
+
+class DeletionScheduler:
+    #queues messages to delete per channel and removes them in bulk-delete calls (up to 100 ids each)
+    #instead of one sleeping coroutine + one delete request per message
+    #each channel has one flush task; ids are only deleted once their delay has passed, and tracked
+    #embeds are filtered out at that point, which is what the old per-message 2 second sleep was waiting for
+    BULK_LIMIT = 100  #discord's max ids per bulk delete
+
+    def __init__(self, is_tracked: Callable[[int], bool], logger, delay: float = 2.0, min_interval: float = 1.0) -> None:
+        self.is_tracked = is_tracked
+        self.logger = logger
+        self.delay = delay
+        self.min_interval = min_interval  #seconds between delete calls on the same channel (one rate limit bucket)
+        self.queues: Dict[int, Dict[int, float]] = {}  #channel id -> {message id: due time}, in due order
+        self.channels = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.last_call: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def schedule(self, message: discord.Message, delay: float = None) -> None:
+        channel = message.channel
+        due = time.monotonic() + (self.delay if delay is None else delay)
+        queue = self.queues.setdefault(channel.id, {})
+        if queue:
+            due = max(due, next(reversed(queue.values())))  #keep due times in order so the flush can stop at the first one not due
+        queue[message.id] = due
+        self.channels[channel.id] = channel
+        task = self.tasks.get(channel.id)
+        if task is None or task.done():
+            task = self.tasks[channel.id] = asyncio.create_task(self._run(channel.id))
+            task.add_done_callback(self._task_done)
+
+    async def _run(self, channel_id: int) -> None:
+        queue = self.queues[channel_id]
+        while queue:
+            now = time.monotonic()
+            first_due = next(iter(queue.values()))
+            wait = max(first_due - now, self.last_call.get(channel_id, 0) + self.min_interval - now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            ids = []
+            for message_id, due in list(queue.items()):
+                if due > now or len(ids) == self.BULK_LIMIT:
+                    break
+                del queue[message_id]
+                if not self.is_tracked(message_id):
+                    ids.append(message_id)
+            if ids:
+                self.last_call[channel_id] = time.monotonic()
+                try:
+                    await self._delete(self.channels[channel_id], ids)
+                except Exception as e:
+                    #a network error mustn't end the flush task, the next batch gets its own attempt
+                    self.logger.error(f"Error deleting {len(ids)} messages in {channel_id}: {type(e).__name__}: {e}")
+
+        self.queues.pop(channel_id, None)
+        self.channels.pop(channel_id, None)
+        self.tasks.pop(channel_id, None)
+
+    async def _delete(self, channel, ids) -> None:
+        try:
+            if len(ids) > 1 and hasattr(channel, "delete_messages"):
+                await channel.delete_messages([discord.Object(id=message_id) for message_id in ids])
+                return
+        except discord.errors.NotFound:
+            #bulk delete fails as a whole if one id is gone; retry the rest one by one
+            pass
+        except Exception as e:  #HTTPException, and aiohttp.ClientError / asyncio.TimeoutError from the connection
+            self.logger.debug(f"Bulk delete of {len(ids)} messages in {channel.id} failed, deleting one by one: {e}")
+
+        for message_id in ids:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.errors.NotFound:
+                self.logger.debug(f"Tried to delete a message that no longer exists: {message_id}") #weird error where tries to delete nonexistent/ephermal msg
+            except Exception as e:
+                self.logger.debug(f"Error deleting message {message_id}: {e}")
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        #_run handles its own errors, so this only fires on a bug; the channel's next schedule() starts a new task
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Autodelete flush task died", exc_info=task.exception())
+
+    async def close(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
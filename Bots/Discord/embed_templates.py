@@ -0,0 +1,178 @@
+import asyncio
+import datetime
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, Optional
+
+import discord
+
+URL_REGEX = re.compile(
+        r'^(?:http|ftp)s?://' # http:// or https://
+        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|' #domain...
+        r'localhost|' #localhost...
+        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})' # ...or ip
+        r'(?::\d+)?' # optional port
+        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
+DEFAULT_COLOR = "EFBF04"  #lime green
+
+
+class EmbedError(ValueError):
+    #message is shown to the admin as is
+    pass
+
+
+def build_embed(title: str = "", desc: str = "", media: str = "", footer_timestamp: str = "", fields: str = "", color: str = "") -> discord.Embed:
+    #the /create_embed form fields -> validated embed, raises EmbedError on bad input
+    try:
+        embed_color = discord.Color(int((color or DEFAULT_COLOR).strip("#"), 16))
+    except ValueError:
+        raise EmbedError("Invalid color format. Use hex format like #7289DA.")
+    embed = discord.Embed(
+        description=desc or None,
+        color=embed_color
+    )
+
+    title_parts = title.split("||")
+    embed.title = title_parts[0].strip() if title_parts[0] else None
+    if len(title_parts) > 1:
+        if URL_REGEX.match(title_parts[1].strip()) is not None:
+            embed.url = title_parts[1].strip()
+        else:
+            raise EmbedError("Invalid Title Url!")
+
+    media_parts = media.split("||")
+    if len(media_parts) >= 1 and media_parts[0].strip():
+        if URL_REGEX.match(media_parts[0].strip()) is not None:
+            embed.set_image(url=media_parts[0].strip())
+        else:
+            raise EmbedError("Invalid Image Url!")
+
+    if len(media_parts) == 2 and media_parts[1].strip():
+        if URL_REGEX.match(media_parts[1].strip()) is not None:
+            embed.set_thumbnail(url=media_parts[1].strip())
+        else:
+            raise EmbedError("Invalid Thumbnail Url!")
+
+    footer_parts = footer_timestamp.split("||")
+    if len(footer_parts) >= 1 and footer_parts[0].strip():
+        embed.set_footer(text=footer_parts[0].strip())
+
+    if len(footer_parts) == 2:
+        try:
+            embed.timestamp = datetime.datetime.strptime(footer_parts[1].strip(), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise EmbedError("Invalid timestamp format. Use **YYYY-MM-DD HH:MM:SS**.")
+
+    if fields:
+        field_lines = fields.split("\n")
+        if len(field_lines) > 25:
+            raise EmbedError("You can only have up to 25 fields.")
+
+        for line in field_lines:
+            parts = line.split("||")
+            if len(parts) < 2:
+                continue
+            name = parts[0].strip()
+            value = parts[1].strip()
+            inline = parts[2].strip().lower() == "true" if len(parts) == 3 else False
+            embed.add_field(name=name, value=value, inline=inline)
+    if embed.description == None and embed.title == None and embed.image.url == None:
+        raise EmbedError("No title, description or image given!")
+    return embed
+
+
+class EmbedTemplates:
+    #saved /create_embed forms by template id; the raw form is persisted and the built embed cached,
+    #so sending a template again skips parsing and validation
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.forms: Dict[str, dict] = {}  #template id -> build_embed kwargs
+        self.embeds: Dict[str, discord.Embed] = {}
+        if path and os.path.isfile(path):
+            with open(path) as file:
+                self.forms = json.load(file)
+
+    def __contains__(self, template_id: str) -> bool:
+        return template_id.lower() in self.forms
+
+    def ids(self) -> list:
+        return sorted(self.forms)
+
+    def save(self, template_id: str, form: dict) -> discord.Embed:
+        embed = build_embed(**form)  #validate before storing
+        template_id = template_id.lower()
+        self.forms[template_id] = form
+        self.embeds[template_id] = embed
+        self.write()
+        return embed
+
+    def delete(self, template_id: str) -> bool:
+        template_id = template_id.lower()
+        if self.forms.pop(template_id, None) is None:
+            return False
+        self.embeds.pop(template_id, None)
+        self.write()
+        return True
+
+    def get(self, template_id: str) -> discord.Embed:
+        template_id = template_id.lower()
+        embed = self.embeds.get(template_id)
+        if embed is None:
+            embed = self.embeds[template_id] = build_embed(**self.forms[template_id])
+        return embed
+
+    def write(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.forms, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+async def broadcast(channels, embed: discord.Embed, concurrency: int = 5, on_sent: Optional[Callable] = None):
+    #sends to every channel at once, at most `concurrency` requests in flight; each channel is its own discord
+    #rate limit bucket and discord.py waits out 429s per bucket, the semaphore keeps us well under the global limit
+    #on_sent(message) runs as soon as each send returns, not after the whole broadcast, so callers can track
+    #messages before autodelete reaches them
+    #returns [(channel, message or None, seconds, error or None)] in channel order
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(channel):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                message = await channel.send(embed=embed)
+            except Exception as e:
+                return channel, None, time.perf_counter() - start, e
+            if on_sent is not None:
+                on_sent(message)
+            return channel, message, time.perf_counter() - start, None
+
+    return await asyncio.gather(*(send(channel) for channel in channels))
+
+
+if __name__ == "__main__":
+    #one slow channel mustn't hold back tracking of the messages already sent to the others
+    class FakeChannel:
+        def __init__(self, id, delay):
+            self.id, self.delay = id, delay
+
+        async def send(self, embed):
+            await asyncio.sleep(self.delay)
+            return discord.Object(id=self.id)
+
+    async def main():
+        tracked = []
+        slow = FakeChannel(3, 0.5)
+        task = asyncio.create_task(broadcast([FakeChannel(1, 0), FakeChannel(2, 0.01), slow], discord.Embed(), on_sent=lambda m: tracked.append(m.id)))
+        await asyncio.sleep(0.1)
+        assert tracked == [1, 2] and not task.done(), tracked
+        results = await task
+        assert tracked == [1, 2, 3] and all(message is not None for _, message, _, _ in results)
+        print("messages are tracked as each send returns")
+
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+
+class LoggingFormatter(logging.Formatter):
+    # Colors
+    black = "\x1b[30m"
+    red = "\x1b[31m"
+    green = "\x1b[32m"
+    yellow = "\x1b[33m"
+    blue = "\x1b[34m"
+    gray = "\x1b[38m"
+    # Styles
+    reset = "\x1b[0m"
+    bold = "\x1b[1m"
+
+    COLORS = {
+        logging.DEBUG: gray + bold,
+        logging.INFO: blue + bold,
+        logging.WARNING: yellow + bold,
+        logging.ERROR: red,
+        logging.CRITICAL: red + bold,
+    }
+
+    def __init__(self) -> None:
+        super().__init__()
+        #one formatter per level built up front, format() used to rebuild the string + formatter on every record
+        self.formatters = {level: self.build(color) for level, color in self.COLORS.items()}
+
+    def build(self, log_color: str) -> logging.Formatter:
+        format = "(black){asctime}(reset) (levelcolor){levelname:<8}(reset) (green){name}(reset) {message}"
+        format = format.replace("(black)", self.black + self.bold)
+        format = format.replace("(reset)", self.reset)
+        format = format.replace("(levelcolor)", log_color)
+        format = format.replace("(green)", self.green + self.bold)
+        return logging.Formatter(format, "%Y-%m-%d %H:%M:%S", style="{")
+
+    def format(self, record):
+        formatter = self.formatters.get(record.levelno)
+        if formatter is None:  #custom levels
+            formatter = self.formatters[record.levelno] = self.build(self.reset)
+        return formatter.format(record)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        #the default prepare() formats the whole record and copies it on the caller; only the message needs
+        #resolving here (args may change after the call), the listener's handlers do the actual formatting
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    name: str = "discord_bot",
+    filename: str = "discord.log",
+    level: int = logging.INFO,
+    max_bytes: int = 5 * 1024 * 1024,
+    backup_count: int = 5,
+    console: bool = True,
+):
+    #the logger only puts records on a queue; a QueueListener thread formats them and does the console/file writes,
+    #so logging from a command or error handler never blocks the event loop on I/O
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(LoggingFormatter())
+    #rotates by size instead of truncating the log on every start
+    file_handler = logging.handlers.RotatingFileHandler(
+        filename=filename, encoding="utf-8", maxBytes=max_bytes, backupCount=backup_count
+    )
+    file_handler_formatter = logging.Formatter(
+        "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
+    )
+    file_handler.setFormatter(file_handler_formatter)
+
+    log_queue = queue.SimpleQueue()
+    handlers = [console_handler, file_handler] if console else [file_handler]
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  #flushes whatever is still queued on shutdown
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.addHandler(_QueueHandler(log_queue))
+    return logger, listener
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Records/sec through the old inline handlers vs the queue pipeline")
+    parser.add_argument("--records", type=int, default=50000)
+    args = parser.parse_args()
+
+    def old_format(record):
+        #what LoggingFormatter.format did before, for comparison
+        format = "(black){asctime}(reset) (levelcolor){levelname:<8}(reset) (green){name}(reset) {message}"
+        format = format.replace("(black)", LoggingFormatter.black + LoggingFormatter.bold)
+        format = format.replace("(reset)", LoggingFormatter.reset)
+        format = format.replace("(levelcolor)", LoggingFormatter.COLORS[record.levelno])
+        format = format.replace("(green)", LoggingFormatter.green + LoggingFormatter.bold)
+        return logging.Formatter(format, "%Y-%m-%d %H:%M:%S", style="{").format(record)
+
+    record = logging.LogRecord("discord_bot", logging.DEBUG, __file__, 0, "Executed help command by user (ID: 1)", None, None)
+    for label, format in (("old formatter", old_format), ("precompiled formatter", LoggingFormatter().format)):
+        start = time.perf_counter()
+        for _ in range(args.records):
+            format(record)
+        elapsed = time.perf_counter() - start
+        print(f"{label:30} {args.records / elapsed:12,.0f} records/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        #caller-side cost: how long a logger.debug call holds up the event loop
+        inline = logging.getLogger("bench_inline")
+        inline.propagate = False
+        inline.setLevel(logging.DEBUG)
+        handler = logging.FileHandler(os.path.join(directory, "inline.log"), encoding="utf-8", mode="w")
+        handler.setFormatter(logging.Formatter("[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"))
+        inline.addHandler(handler)
+
+        queued, listener = setup_logging("bench_queued", os.path.join(directory, "queued.log"), logging.DEBUG, console=False)
+        queued.propagate = False
+
+        for label, logger in (("inline FileHandler", inline), ("QueueHandler", queued)):
+            start = time.perf_counter()
+            for i in range(args.records):
+                logger.debug(f"Executed help command by user (ID: {i})")
+            elapsed = time.perf_counter() - start
+            print(f"{label:30} {args.records / elapsed:12,.0f} records/s on the caller ({elapsed / args.records * 1e6:.2f}us each)")
+
+        start = time.perf_counter()
+        atexit.unregister(listener.stop)
+        listener.stop()
+        print(f"{'listener drain':30} {time.perf_counter() - start:12.3f}s for the queued backlog")
+        handler.close()
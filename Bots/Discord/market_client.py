@@ -0,0 +1,185 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import aiohttp
+
+
+class MarketAPIError(Exception):
+    pass
+
+
+class MarketClient:
+    #read-only client for the StockPiece backend's public routes
+    #one pooled aiohttp session for the whole bot, a TTL cache per endpoint, and request coalescing:
+    #while a request for a path is in flight every other caller awaits the same task instead of sending its own,
+    #so a burst of identical commands after a chapter release costs the backend one request per TTL
+    TTLS = {  #seconds per endpoint
+        "/market/status": 30,
+        "/market/chapters/latest": 60,
+        "/market/statistics/all": 300,
+        "/user/leaderboard": 120,
+    }
+    DEFAULT_TTL = 60
+
+    def __init__(self, base_url: str, logger=None, timeout: float = 10.0, max_connections: int = 10) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.logger = logger
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.session: Optional[aiohttp.ClientSession] = None  #made on first request, it needs the running loop
+        self.cache: Dict[tuple, tuple] = {}  #(path, params) -> (expires at, data)
+        self.inflight: Dict[tuple, asyncio.Task] = {}
+        self.upstream_requests = 0
+
+    async def close(self) -> None:
+        for task in list(self.inflight.values()):
+            task.cancel()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def invalidate(self, path: str = None) -> None:
+        if path is None:
+            self.cache.clear()
+        else:
+            for key in [key for key in self.cache if key[0] == path]:
+                del self.cache[key]
+
+    def is_fresh(self, path: str, params: dict = None) -> bool:
+        cached = self.cache.get((path, tuple(sorted((params or {}).items()))))
+        return cached is not None and cached[0] > time.monotonic()
+
+    async def get(self, path: str, params: dict = None, ttl: float = None):
+        key = (path, tuple(sorted((params or {}).items())))
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self.inflight.get(key)
+        if task is None:
+            #the request runs in its own task, not in the first caller, so cancelling any caller (the first one
+            #included) leaves the request running for everyone else
+            task = self.inflight[key] = asyncio.ensure_future(self.refresh(key, path, params, ttl, cached))
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())  #retrieved even if every caller left
+        return await asyncio.shield(task)
+
+    async def refresh(self, key: tuple, path: str, params: dict, ttl: float, cached: tuple):
+        try:
+            data = await self.fetch(path, params)
+        except Exception as e:
+            if cached is None:
+                raise
+            #serve the stale copy rather than failing everyone while the backend is struggling
+            if self.logger:
+                self.logger.warning(f"Market API request to {path} failed, serving cached data: {e}")
+            return cached[1]
+        else:
+            self.cache[key] = (time.monotonic() + (ttl if ttl is not None else self.TTLS.get(path, self.DEFAULT_TTL)), data)
+            return data
+        finally:
+            del self.inflight[key]
+
+    async def fetch(self, path: str, params: dict = None):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        self.upstream_requests += 1
+        async with self.session.get(f"{self.base_url}{path}", params=params) as response:
+            try:
+                body = await response.json(content_type=None)
+            except ValueError:
+                raise MarketAPIError(f"{path} returned a non-JSON response ({response.status})")
+        #backend responses are ApiResponse objects: {statusCode, data, message, success}
+        if response.status >= 400 or not isinstance(body, dict) or not body.get("success", False):
+            message = body.get("message") if isinstance(body, dict) else None
+            raise MarketAPIError(f"{path} failed ({response.status}): {message or 'unknown error'}")
+        return body.get("data")
+
+    async def market_status(self) -> str:
+        return await self.get("/market/status")  #"open" or "closed"
+
+    async def latest_chapter(self) -> dict:
+        return await self.get("/market/chapters/latest")
+
+    async def statistics(self) -> dict:
+        return await self.get("/market/statistics/all")  #{chapter: [{name, oldValue, newValue}, ...]}
+
+    async def leaderboard(self, order_by: str = "totalValue") -> list:
+        data = await self.get("/user/leaderboard", {"orderBy": order_by})
+        return data["topUsers"]
+
+    async def prices(self) -> dict:
+        #{stock name: (old value, new value)} from the most recent chapter with price updates
+        statistics = await self.statistics()
+        if not statistics:
+            return {}
+        latest = max(statistics, key=int)
+        return {update["name"]: (update.get("oldValue"), update["newValue"]) for update in statistics[latest]}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="Run the client against a local stand-in for the backend")
+    parser.add_argument("--callers", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds the stand-in takes per response")
+    args = parser.parse_args()
+
+    hits = {}
+
+    def stand_in(data):
+        async def handler(request):
+            hits[request.path] = hits.get(request.path, 0) + 1
+            await asyncio.sleep(args.latency)
+            return web.json_response({"statusCode": 200, "data": data, "message": "ok", "success": True})
+        return handler
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/api/v1/market/status", stand_in("open"))
+        app.router.add_get("/api/v1/market/chapters/latest", stand_in({"chapter": 1141, "isPriceUpdated": False}))
+        app.router.add_get("/api/v1/market/statistics/all", stand_in({
+            "1140": [{"name": "Luffy", "newValue": 1000}],
+            "1141": [{"name": "Luffy", "oldValue": 1000, "newValue": 1180}, {"name": "Zoro", "oldValue": 800, "newValue": 760}],
+        }))
+        app.router.add_get("/api/v1/user/leaderboard", stand_in({"topUsers": [{"name": "a", "totalValue": 1}], "currentUser": None}))
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        client = MarketClient(f"http://127.0.0.1:{port}/api/v1")
+        calls = [client.market_status, client.latest_chapter, client.prices, client.leaderboard]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(calls[i % len(calls)]() for i in range(args.callers)))
+        elapsed = time.perf_counter() - start
+        print(f"{args.callers} concurrent callers -> {client.upstream_requests} upstream requests in {elapsed * 1000:.0f}ms")
+        print(f"hits per endpoint: {hits}")
+        assert client.upstream_requests == len(calls)
+        assert results[2] == {"Luffy": (1000, 1180), "Zoro": (800, 760)}
+
+        await asyncio.gather(*(client.market_status() for _ in range(args.callers)))
+        assert client.upstream_requests == len(calls), "cached calls went upstream"
+        print("second burst served from cache")
+
+        #the caller that started a request is cancelled (e.g. its interaction timed out), the others still get the data
+        client.invalidate("/market/status")
+        first = asyncio.create_task(client.market_status())
+        await asyncio.sleep(0)
+        others = [asyncio.create_task(client.market_status()) for _ in range(10)]
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await asyncio.wait_for(asyncio.gather(*others), timeout=args.latency + 5) == ["open"] * 10
+        assert not client.inflight and client.upstream_requests == len(calls) + 1
+        print("cancelling the first caller doesn't strand the others")
+
+        await client.close()
+        await runner.cleanup()
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class MessageRegistry:
+    #ids of messages the bot must not autodelete (embeds made with /create_embed)
+    #dict lookups keep on_message O(1), and old entries are evicted by count and/or age so it can't grow forever
+    #changes only mark it dirty, the owner calls save() periodically and on shutdown
+    def __init__(self, max_size: int = 10000, max_age: Optional[float] = None, path: Optional[str] = None) -> None:
+        self.max_size = max_size
+        self.max_age = max_age  #seconds, None keeps entries until pushed out by max_size
+        self.path = path  #json file to persist to, None for memory only
+        self.entries = OrderedDict()  #message id -> time added, oldest first
+        self.dirty = False
+        if path and os.path.isfile(path):
+            self.load()
+
+    def __contains__(self, message_id: int) -> bool:
+        added = self.entries.get(message_id)
+        if added is None:
+            return False
+        if self.max_age is not None and time.time() - added > self.max_age:
+            self.evict()
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, message_id: int) -> None:
+        self.entries[message_id] = time.time()
+        self.entries.move_to_end(message_id)
+        self.evict()
+        self.dirty = True
+
+    def discard(self, message_id: int) -> None:
+        if self.entries.pop(message_id, None) is not None:
+            self.dirty = True
+
+    def evict(self) -> None:
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.dirty = True
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            while self.entries and next(iter(self.entries.values())) < cutoff:
+                self.entries.popitem(last=False)
+                self.dirty = True
+
+    def load(self) -> None:
+        with open(self.path) as file:
+            self.entries = OrderedDict((int(message_id), added) for message_id, added in json.load(file))
+        self.evict()
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        #write then rename so a crash mid-write can't lose the whole registry
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(list(self.entries.items()), file)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,140 @@
+import asyncio
+import bisect
+import math
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+#seconds; commands wait on discord and the backend so the range goes up to tens of seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], le: str = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in self.values.items()]
+        return lines
+
+
+class Gauge:
+    #either set() directly or given a callback that's read on every scrape
+    def __init__(self, name: str, help: str, callback: Optional[Callable[[], float]] = None) -> None:
+        self.name, self.help, self.callback = name, help, callback
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self) -> list:
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                value = math.nan
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS, labels: Tuple[str, ...] = ()) -> None:
+        self.name, self.help, self.buckets, self.labels = name, help, tuple(buckets), labels
+        self.series: Dict[tuple, list] = {}  #label values -> [per-bucket counts + overflow, sum, count]
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1  #le is inclusive
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Metrics:
+    #in-process metrics registry, served in Prometheus text format by serve()
+    def __init__(self) -> None:
+        self.metrics: Dict[str, object] = {}
+        self.command_latency = self.add(Histogram(
+            "discord_bot_command_duration_seconds", "Time from invocation to completion per command.", labels=("command", "kind")
+        ))
+        self.event_latency = self.add(Histogram(
+            "discord_bot_event_handler_duration_seconds", "Time spent in the bot's own event handlers, by event.", labels=("event",)
+        ))
+        self.command_errors = self.add(Counter(
+            "discord_bot_command_errors_total", "Command errors by command and exception type.", labels=("command", "type")
+        ))
+        self.loop_lag = self.add(Histogram(
+            "discord_bot_event_loop_lag_seconds", "How late the event loop ran a timer it was given.", buckets=LAG_BUCKETS
+        ))
+        self.runner: Optional[web.AppRunner] = None
+        self.lag_task: Optional[asyncio.Task] = None
+
+    def add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, help: str, callback: Callable[[], float]) -> Gauge:
+        return self.add(Gauge(name, help, callback))
+
+    def remove(self, name: str) -> None:
+        self.metrics.pop(name, None)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    async def sample_loop_lag(self, interval: float = 0.5) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, time.perf_counter() - start - interval))
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        self.lag_task = asyncio.create_task(self.sample_loop_lag())
+
+    async def close(self) -> None:
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+        if self.runner is not None:
+            await self.runner.cleanup()
@@ -0,0 +1,220 @@
+import asyncio
+import bisect
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import discord
+
+
+class AlertIndex:
+    #price alerts ("tell me when Luffy crosses 1200") kept per stock as a sorted list of thresholds with the
+    #subscribed user ids alongside, so a price move from old to new only visits the thresholds between them (two bisects)
+    #instead of scanning every subscription; alerts are one-shot and dropped once triggered, moving to `pending`
+    #until their DM has gone out, so a restart in between resends them instead of losing them
+    def __init__(self, path: Optional[str] = None, max_per_user: int = 25) -> None:
+        self.path = path  #json file to persist to, None for memory only
+        self.max_per_user = max_per_user
+        self.thresholds: Dict[str, List[float]] = {}  #stock -> sorted thresholds
+        self.users: Dict[str, List[int]] = {}  #stock -> user id for each threshold, same order
+        self.per_user: Dict[int, int] = {}  #user id -> alert count
+        self.last_chapter = None  #newest chapter whose prices have been checked
+        self.pending: Dict[int, List[tuple]] = {}  #user id -> triggered (stock, threshold, old, new) not yet delivered
+        self.dirty = False
+        if path and os.path.isfile(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(self.per_user.values())
+
+    def add(self, user_id: int, stock: str, threshold: float) -> bool:
+        if self.per_user.get(user_id, 0) >= self.max_per_user or (user_id, threshold) in self.alerts_for(user_id, stock):
+            return False
+        thresholds = self.thresholds.setdefault(stock, [])
+        i = bisect.bisect_right(thresholds, threshold)
+        thresholds.insert(i, threshold)
+        self.users.setdefault(stock, []).insert(i, user_id)
+        self.per_user[user_id] = self.per_user.get(user_id, 0) + 1
+        self.dirty = True
+        return True
+
+    def remove(self, user_id: int, stock: str, threshold: float) -> bool:
+        thresholds = self.thresholds.get(stock, [])
+        users = self.users.get(stock, [])
+        i = bisect.bisect_left(thresholds, threshold)
+        while i < len(thresholds) and thresholds[i] == threshold:
+            if users[i] == user_id:
+                del thresholds[i], users[i]
+                self._forget(user_id)
+                self.dirty = True
+                return True
+            i += 1
+        return False
+
+    def _forget(self, user_id: int) -> None:
+        self.per_user[user_id] -= 1
+        if not self.per_user[user_id]:
+            del self.per_user[user_id]
+
+    def alerts_for(self, user_id: int, stock: str = None) -> List[Tuple[int, float]]:
+        #[(user id, threshold)] or with stock=None [(stock, threshold)]; a scan, only used by commands
+        if stock is not None:
+            return [(user, t) for user, t in zip(self.users.get(stock, []), self.thresholds.get(stock, [])) if user == user_id]
+        return [(s, t) for s in self.thresholds for user, t in zip(self.users[s], self.thresholds[s]) if user == user_id]
+
+    def check(self, changes: Dict[str, Tuple[float, float]]) -> List[Tuple[int, str, float, float, float]]:
+        #changes: {stock: (old price, new price)} -> triggered [(user id, stock, threshold, old, new)], removed from the index
+        triggered = []
+        for stock, (old, new) in changes.items():
+            thresholds = self.thresholds.get(stock)
+            if not thresholds or old is None or new is None or old == new:
+                continue
+            #rising: thresholds in (old, new]; falling: thresholds in [new, old)
+            if new > old:
+                start, end = bisect.bisect_right(thresholds, old), bisect.bisect_right(thresholds, new)
+            else:
+                start, end = bisect.bisect_left(thresholds, new), bisect.bisect_left(thresholds, old)
+            if start == end:
+                continue
+            users = self.users[stock]
+            for user_id, threshold in zip(users[start:end], thresholds[start:end]):
+                triggered.append((user_id, stock, threshold, old, new))
+                self.pending.setdefault(user_id, []).append((stock, threshold, old, new))
+                self._forget(user_id)
+            del thresholds[start:end], users[start:end]
+            self.dirty = True
+        return triggered
+
+    def delivered(self, user_id: int, alerts) -> None:
+        #alerts: [(stock, threshold, old, new)] whose DM went out (or can never go out)
+        pending = self.pending.get(user_id, [])
+        for alert in alerts:
+            if alert in pending:
+                pending.remove(alert)
+        if not pending:
+            self.pending.pop(user_id, None)
+        self.dirty = True
+
+    def pending_alerts(self) -> List[Tuple[int, str, float, float, float]]:
+        #same shape as check() returns, for redelivery
+        return [(user_id, *alert) for user_id, alerts in self.pending.items() for alert in alerts]
+
+    def load(self) -> None:
+        with open(self.path) as file:
+            data = json.load(file)
+        self.last_chapter = data.get("last_chapter")
+        self.pending = {int(user_id): [tuple(alert) for alert in alerts] for user_id, alerts in data.get("pending", {}).items()}
+        #stored per stock as [[threshold, ...], [user id, ...]], already sorted
+        for stock, (thresholds, users) in data["alerts"].items():
+            self.thresholds[stock] = thresholds
+            self.users[stock] = users
+            for user_id in users:
+                self.per_user[user_id] = self.per_user.get(user_id, 0) + 1
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        #write then rename so a crash mid-write can't lose every alert
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({
+                "last_chapter": self.last_chapter,
+                "alerts": {stock: [thresholds, self.users[stock]] for stock, thresholds in self.thresholds.items() if thresholds},
+                "pending": self.pending,
+            }, file, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+class DMDispatcher:
+    #sends triggered alerts as DMs from a queue: one message per user per batch (all of their alerts together),
+    #spaced at most `rate` sends per second so a chapter close doesn't turn into a burst of thousands of API calls
+    #on_delivered(user id, alerts) runs once a DM is sent or can never be (DMs closed); other failures are left for a retry
+    def __init__(self, bot, rate: float = 5.0, on_delivered: Optional[Callable] = None) -> None:
+        self.bot = bot
+        self.on_delivered = on_delivered
+        self.interval = 1 / rate
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def dispatch(self, triggered) -> None:
+        by_user: Dict[int, list] = {}
+        for user_id, stock, threshold, old, new in triggered:
+            by_user.setdefault(user_id, []).append((stock, threshold, old, new))
+        for user_id, alerts in by_user.items():
+            self.queue.put_nowait((user_id, alerts))
+
+    async def _run(self) -> None:
+        last_send = 0.0
+        while True:
+            user_id, alerts = await self.queue.get()
+            wait = last_send + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            last_send = time.monotonic()
+            try:
+                user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                await user.send(embed=alert_embed(alerts))
+                self.sent += 1
+            except (discord.Forbidden, discord.NotFound):
+                self.failed += 1  #DMs closed or account gone, nothing to retry
+            except Exception as e:
+                self.failed += 1
+                self.bot.logger.debug(f"Error sending price alert DM to {user_id}, retrying on restart: {e}")
+                continue
+            if self.on_delivered is not None:
+                self.on_delivered(user_id, alerts)
+
+
+def alert_embed(alerts) -> discord.Embed:
+    lines = []
+    for stock, threshold, old, new in alerts[:25]:
+        direction = "rose above" if new > old else "fell below"
+        lines.append(f"**{stock}** {direction} {threshold:,.2f} ({old:,.2f} -> {new:,.2f})")
+    if len(alerts) > 25:
+        lines.append(f"...and {len(alerts) - 25} more")
+    return discord.Embed(title="Price alert", description="\n".join(lines), color=0xEFBF04)
+
+
+if __name__ == "__main__":
+    import random
+
+    #tens of thousands of alerts checked against one chapter's price moves, index vs a scan of every alert
+    rng = random.Random(0)
+    stocks = [f"stock{i}" for i in range(60)]
+    prices = {stock: rng.uniform(100, 3000) for stock in stocks}
+    alerts = [(rng.randrange(1, 20000), rng.choice(stocks)) for _ in range(50000)]
+    alerts = [(user, stock, round(prices[stock] * rng.uniform(0.5, 1.5), 2)) for user, stock in alerts]
+
+    index = AlertIndex(max_per_user=1000)
+    for user, stock, threshold in alerts:
+        index.add(user, stock, threshold)
+    changes = {stock: (price, price * rng.uniform(0.8, 1.2)) for stock, price in prices.items()}
+
+    start = time.perf_counter()
+    naive = [
+        (user, stock, threshold) for user, stock, threshold in alerts
+        if min(changes[stock]) <= threshold <= max(changes[stock]) and threshold != changes[stock][0]
+    ]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    triggered = index.check(changes)
+    index_time = time.perf_counter() - start
+
+    print(f"{len(index) + len(triggered)} alerts, {len(triggered)} triggered")
+    print(f"scan: {scan_time * 1000:.2f}ms, index: {index_time * 1000:.2f}ms")
+    assert sorted(naive) == sorted((user, stock, threshold) for user, stock, threshold, _, _ in triggered)
+    assert not index.check(changes), "triggered alerts should be removed"
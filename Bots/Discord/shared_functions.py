@@ -1,26 +1,124 @@
 import os
 import json
 import sys
+import time
+import logging
 import discord
 
+CONFIG_PATH = f"{os.path.realpath(os.path.dirname(__file__))}/config.json"
 
-if not os.path.isfile(f"{os.path.realpath(os.path.dirname(__file__))}/config.json"):
+#key -> allowed types, checked on every (re)load
+CONFIG_SCHEMA = {
+    "prefix": (str,),
+    "inv_link": (str,),
+    "website_link": (str,),
+    "server_link": (str,),
+    "owner_command_users": (list,),
+    "main_guild_id": (int,),
+    "custom_id_hardcode": (str,),
+    "role_breakoff_id": (int,),
+    "admin_role_id": (int, list),  #one role id or a list of them
+    "autodelete_channel": (int,),
+    "api_base_url": (str,),
+    "metrics_port": (int,),  #0 turns the metrics endpoint off
+}
+
+#optional keys, filled in when missing from config.json
+CONFIG_DEFAULTS = {
+    "api_base_url": "https://www.stockpiece.fun/api/v1",
+    "metrics_port": 9464,
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _id_set(value, key):
+    ids = value if isinstance(value, list) else [value]
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ConfigError(f"'{key}' must only contain integer ids")
+    return frozenset(ids)
+
+
+class ConfigSnapshot:
+    #one validated version of config.json, never modified after it's built
+    def __init__(self, values: dict) -> None:
+        values = {**CONFIG_DEFAULTS, **values}
+        for key, types in CONFIG_SCHEMA.items():
+            if key not in values:
+                raise ConfigError(f"'{key}' is missing from config.json")
+            if not isinstance(values[key], types) or isinstance(values[key], bool):
+                raise ConfigError(f"'{key}' must be {' or '.join(t.__name__ for t in types)}, got {type(values[key]).__name__}")
+        self.values = values
+        #precomputed so permission checks are set lookups on ints
+        self.owners = _id_set(values["owner_command_users"], "owner_command_users")
+        self.admin_roles = _id_set(values["admin_role_id"], "admin_role_id")
+        self.main_guild_id = values["main_guild_id"]
+
+
+class Config:
+    #reloads config.json when its mtime changes, checked at most once every check_interval seconds
+    #a reload builds a whole new snapshot and swaps it in with one assignment, so a check never sees half a config,
+    #and an invalid file is logged and ignored, keeping the last good snapshot
+    def __init__(self, path: str, check_interval: float = 1.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self.logger = logging.getLogger("discord_bot")
+        self.mtime = os.stat(path).st_mtime_ns
+        self.snapshot = self.read()
+        self.next_check = time.monotonic() + check_interval
+
+    def read(self) -> ConfigSnapshot:
+        with open(self.path) as file:
+            return ConfigSnapshot(json.load(file))
+
+    def current(self) -> ConfigSnapshot:
+        now = time.monotonic()
+        if now >= self.next_check:
+            self.next_check = now + self.check_interval
+            self.reload()
+        return self.snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self.logger.error(f"Can't stat config.json, keeping the current config: {e}")
+            return False
+        if mtime == self.mtime and not force:
+            return False
+        self.mtime = mtime  #a bad file is reported once, not on every check until it's fixed
+        try:
+            snapshot = self.read()
+        except (OSError, ValueError) as e:  #json.JSONDecodeError and ConfigError are ValueErrors
+            self.logger.error(f"Invalid config.json, keeping the current config: {e}")
+            return False
+        self.snapshot = snapshot
+        self.logger.info("Reloaded config.json")
+        return True
+
+
+if not os.path.isfile(CONFIG_PATH):
     sys.exit("'config.json' not found.")
 else:
-    with open(f"{os.path.realpath(os.path.dirname(__file__))}/config.json") as file:
-        config = json.load(file)
+    try:
+        config = Config(CONFIG_PATH)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Invalid 'config.json': {e}")
 
 def check_owner(interaction: discord.Interaction) -> bool:
-    return interaction.user.id in config["owner_command_users"] and not interaction.guild is None and interaction.guild.id == config["main_guild_id"] #checks if cmd is used in stockpiece server + is one of 25,septic,spacejesus
+    snapshot = config.current()
+    return interaction.user.id in snapshot.owners and not interaction.guild is None and interaction.guild.id == snapshot.main_guild_id #checks if cmd is used in stockpiece server + is one of 25,septic,spacejesus
 
 def check_admin(interaction: discord.Interaction) -> bool:
-    #change to check admin role
-    uroles = [str(role.id) for role in interaction.user.roles]
-    return str(config["admin_role_id"]) in uroles and not interaction.guild is None and interaction.guild.id == config["main_guild_id"] #checks if cmd is used in stockpiece server + is used by an admin
+    snapshot = config.current()
+    if interaction.guild is None or interaction.guild.id != snapshot.main_guild_id:
+        return False
+    return any(role.id in snapshot.admin_roles for role in interaction.user.roles) #checks if cmd is used in stockpiece server + is used by an admin
 
 def check_guild(interaction: discord.Interaction) -> bool:
-    return not interaction.guild is None and interaction.guild.id == config["main_guild_id"] #checks if cmd is used in stockpiece server
+    return not interaction.guild is None and interaction.guild.id == config.current().main_guild_id #checks if cmd is used in stockpiece server
 
 def get_config(x):
-    return config[x]
-
+    return config.current().values[x]
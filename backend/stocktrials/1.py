@@ -7,6 +7,8 @@ BETA = 0.3  # Weight for rolling baseline (0.3 means 30% new data, 70% old)
 
 INITIAL_BERRIES = 100000  # Starting Berries for users
 
+profiler = None  # set by profiling.enable()
+
 # Define 5 random One Piece stocks with initial prices and rolling baselines
 stocks = {
     "Luffy": {"price": 1000, "bought": 0, "sold": 0, "baseline": 100000},
@@ -17,7 +19,7 @@ stocks = {
 }
 
 # Function to calculate price change using tanh dampening
-def calculate_price_change(data):
+def calculate_price_change(data, sensitivity=SENSITIVITY, c=C):
     actual_spending = data["bought"] * data["price"]  # Total money spent on this stock
     baseline_spending = data["baseline"]  # Expected spending
 
@@ -25,20 +27,30 @@ def calculate_price_change(data):
         return 0
 
     demand_factor = (actual_spending - baseline_spending) / baseline_spending
-    adjustment = SENSITIVITY * math.tanh(demand_factor / C)
+    adjustment = sensitivity * math.tanh(demand_factor / c)
 
     return data["price"] * adjustment  # Change in price
 
 # Function to update stock prices
-def update_stock_prices(stocks):
+def update_stock_prices(stocks, sensitivity=SENSITIVITY, c=C, beta=BETA):
     for stock, data in stocks.items():
-        price_change = calculate_price_change(data)
+        if profiler is not None:
+            started = profiler.clock()
+        price_change = calculate_price_change(data, sensitivity, c)
+        if profiler is not None:
+            started = profiler.lap("1.py:tanh_adjustment", started, price_change=price_change)
         new_price = max(data["price"] + price_change, 0)  # Prevent negative prices
         stocks[stock]["price"] = new_price
+        if profiler is not None:
+            if new_price == 0:
+                profiler.hit("1.py:price_floor")
+            started = profiler.lap("1.py:clamp", started)
 
         # Update rolling baseline
         actual_spending = data["bought"] * data["price"]
-        stocks[stock]["baseline"] = BETA * actual_spending + (1 - BETA) * data["baseline"]
+        stocks[stock]["baseline"] = beta * actual_spending + (1 - beta) * data["baseline"]
+        if profiler is not None:
+            profiler.lap("1.py:baseline", started)
 
     return stocks
 
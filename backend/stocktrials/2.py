@@ -2,6 +2,8 @@
 
 import math
 
+profiler = None  # set by profiling.enable()
+
 def calculate_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap):
     # Handle zero trading volume
     total_volume = bought_this_chap + sold_this_chap
@@ -33,6 +35,8 @@ def calculate_price_update(current_price, prev_circulation, bought_this_chap, so
     return max(new_price, 0.01)  # Never below 1 cent
 
 def gpt_calculate_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap):
+    if profiler is not None:
+        started = profiler.clock()
     total_volume = bought_this_chap + sold_this_chap
     if total_volume == 0:
         return current_price
@@ -47,6 +51,8 @@ def gpt_calculate_price_update(current_price, prev_circulation, bought_this_chap
     # Using the actual circulating supply makes volume_ratio more sensitive when supply is low.
     volume_ratio = total_volume / effective_circulation
     volume_impact = math.log(1 + volume_ratio) * 2
+    if profiler is not None:
+        started = profiler.lap("2.py:volume_impact", started, volume_ratio=volume_ratio, buy_pressure=buy_pressure)
 
     # --- Damping factor based on total stocks in the market (circulation) ---
     if prev_circulation > 0:
@@ -55,16 +61,22 @@ def gpt_calculate_price_update(current_price, prev_circulation, bought_this_chap
         price_dampener = 1  # in an illiquid market, apply full effect
     # Price dampener reduces impact for higher-priced stocks.
     # price_dampener = 1 / (1 + math.log(1 + current_price / 100))
+    if profiler is not None:
+        started = profiler.lap("2.py:dampener", started, price_dampener=price_dampener)
 
     # Raw percent change based on trading pressure and liquidity.
     percent_change = buy_pressure * volume_impact * price_dampener * 100
 
     # Clamp the percentage change to a dynamic maximum.
     max_change_percent = 300 / (1 + math.log(1 + current_price / 50))
+    if profiler is not None and abs(percent_change) > max_change_percent:
+        profiler.hit("2.py:rise_cap" if percent_change > 0 else "2.py:drop_cap")
     percent_change = max(min(percent_change, max_change_percent), -max_change_percent)
 
     # Calculate base new price from percent change.
     new_price = current_price * (1 + percent_change / 100)
+    if profiler is not None:
+        started = profiler.lap("2.py:clamp", started, percent_change=percent_change)
 
     # --- New Section: Incorporate circulation change ---
     # For instance, if selling removes shares from circulation, compute the new circulating supply.
@@ -78,6 +90,10 @@ def gpt_calculate_price_update(current_price, prev_circulation, bought_this_chap
     # Adjust new price based on how circulation has changed.
     new_price *= circulation_factor
     # --- End New Section ---
+    if profiler is not None:
+        if new_price < 0.01:
+            profiler.hit("2.py:price_floor")
+        profiler.lap("2.py:circulation", started, circulation_factor=circulation_factor)
 
     # Ensure the new price never falls below 1 cent.
     return max(new_price, 0.01)
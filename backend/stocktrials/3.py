@@ -1,8 +1,25 @@
-def calculate_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap):
+import math
+
+# Tuning knobs, see sweep.py
+MAX_CHANGE = 300  # base cap on the percent change
+CAP_PRICE_SCALE = 50  # price scale the cap shrinks with
+DAMPENER_PRICE_SCALE = 100  # price scale the dampener shrinks with
+DROP_THRESHOLD = 0.5  # sell ratio above which drops are amplified
+DROP_CAP_FACTOR = 1.2  # drops may go this much further than rises
+PRICE_FLOOR = 10
+
+profiler = None  # set by profiling.enable()
+
+def calculate_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap,
+                           max_change=MAX_CHANGE, cap_price_scale=CAP_PRICE_SCALE,
+                           dampener_price_scale=DAMPENER_PRICE_SCALE, drop_threshold=DROP_THRESHOLD,
+                           drop_cap_factor=DROP_CAP_FACTOR, price_floor=PRICE_FLOOR):
     #current price we have
     #prev_circulation is the baseQuantity,
     #bought this chap we total buys
     #sold this chap is the total sells 
+    if profiler is not None:
+        started = profiler.clock()
     total_volume = bought_this_chap + sold_this_chap
     if total_volume == 0:
         return current_price
@@ -16,27 +33,46 @@ def calculate_price_update(current_price, prev_circulation, bought_this_chap, so
     # Volume ratio (trading volume relative to circulation)
     volume_ratio = total_volume / effective_circulation
     volume_impact = math.log(1 + volume_ratio) * 2
+    if profiler is not None:
+        started = profiler.lap("3.py:volume_impact", started, volume_ratio=volume_ratio, buy_pressure=buy_pressure)
     
     # Separate logic for price rises and falls
     if buy_pressure >= 0:
         # Dampening factor for expensive stocks
-        price_dampener = 1 / (1 + math.log(1 + current_price / 100))
+        price_dampener = 1 / (1 + math.log(1 + current_price / dampener_price_scale))
+        if profiler is not None:
+            started = profiler.lap("3.py:dampener", started, price_dampener=price_dampener)
         # Increase max rise allowed if volume_ratio > 1
         extra_rise_factor = volume_ratio if volume_ratio > 1 else 1
-        max_rise_percent = (300 / (1 + math.log(1 + current_price / 50))) * extra_rise_factor
+        max_rise_percent = (max_change / (1 + math.log(1 + current_price / cap_price_scale))) * extra_rise_factor
 
         raw_percent_change = buy_pressure * volume_impact * price_dampener * 100
         percent_change = min(raw_percent_change, max_rise_percent)
+        if profiler is not None:
+            if raw_percent_change > max_rise_percent:
+                profiler.hit("3.py:rise_cap")
+            started = profiler.lap("3.py:clamp", started)
     else:
         # For declines, amplify drop if selling dominates
         sell_ratio = sold_this_chap / total_volume
-        drop_multiplier = 1 + max(0, sell_ratio - 0.5)  # extra penalty if >50% of trades are sells
+        drop_multiplier = 1 + max(0, sell_ratio - drop_threshold)  # extra penalty if >50% of trades are sells
         
-        price_dampener = 1 / (1 + math.log(1 + current_price / 100))
+        price_dampener = 1 / (1 + math.log(1 + current_price / dampener_price_scale))
+        if profiler is not None:
+            started = profiler.lap("3.py:dampener", started, price_dampener=price_dampener,
+                                   sell_ratio=sell_ratio, drop_multiplier=drop_multiplier)
         raw_percent_change = buy_pressure * volume_impact * price_dampener * 100 * drop_multiplier
         # Allow a larger drop than rise cap (e.g. 20% more)
-        max_drop_percent = (300 / (1 + math.log(1 + current_price / 50))) * 1.2
+        max_drop_percent = (max_change / (1 + math.log(1 + current_price / cap_price_scale))) * drop_cap_factor
         percent_change = max(raw_percent_change, -max_drop_percent)
+        if profiler is not None:
+            if raw_percent_change < -max_drop_percent:
+                profiler.hit("3.py:drop_cap")
+            started = profiler.lap("3.py:clamp", started)
     
     new_price = current_price * (1 + percent_change / 100)
-    return max(new_price, 10)  # Ensure price never falls below 1 cent
\ No newline at end of file
+    if profiler is not None:
+        if new_price < price_floor:
+            profiler.hit("3.py:price_floor")
+        profiler.lap("3.py:floor", started, percent_change=percent_change)
+    return max(new_price, price_floor)  # Ensure price never falls below 1 cent
\ No newline at end of file
@@ -0,0 +1,250 @@
+import argparse
+import multiprocessing
+import os
+
+import numpy as np
+
+from batch import batch_asymmetric_price_update, batch_gpt_price_update
+from simulate import STARTING_STOCKS
+from trials import load_trial
+
+# Agent-based market: a population of traders, each with Berries and positions,
+# places buy/sell orders every chapter according to a strategy, and the summed
+# orders go through one of the price models. Traders are split into shards, one
+# worker process per shard holding that shard's state for the whole run; each
+# chapter the workers get the current prices, trade, and send back only their
+# per-stock buy/sell totals, which are merged before the price update.
+
+INITIAL_BERRIES = load_trial(1).INITIAL_BERRIES
+
+ACTIVITY = 0.3  # chance a trader acts in a given chapter
+TRADE_FRACTION = 0.1  # share of a trader's Berries put into one buy
+SELL_FRACTION = 0.5  # share of a position sold on a sell signal
+SIGNAL_NOISE = 0.05  # per-trader noise on the return signal
+
+PRICE_MODELS = {
+    "gpt": batch_gpt_price_update,
+    "3": batch_asymmetric_price_update,
+}
+
+
+# Turn a (traders, stocks) signal into orders: buy the strongest positive
+# signal, sell part of any position with a negative one.
+def _orders_from_signal(signal, prices, berries, holdings, active):
+    n = len(berries)
+    buys = np.zeros(holdings.shape, dtype=np.int64)
+    target = np.argmax(signal, axis=1)
+    buying = active & (signal[np.arange(n), target] > 0)
+    buys[buying, target[buying]] = np.floor(berries[buying] * TRADE_FRACTION / prices[target[buying]])
+
+    selling = active[:, None] & (signal < 0)
+    sells = np.where(selling, np.ceil(holdings * SELL_FRACTION), 0).astype(np.int64)
+    return buys, sells
+
+
+def momentum(prices, returns, berries, holdings, active, rng):
+    signal = returns[None, :] + rng.normal(0, SIGNAL_NOISE, holdings.shape)
+    return _orders_from_signal(signal, prices, berries, holdings, active)
+
+
+def contrarian(prices, returns, berries, holdings, active, rng):
+    signal = -returns[None, :] + rng.normal(0, SIGNAL_NOISE, holdings.shape)
+    return _orders_from_signal(signal, prices, berries, holdings, active)
+
+
+def hold(prices, returns, berries, holdings, active, rng):
+    # Buy one position while holding nothing, then never trade again
+    signal = rng.normal(0, SIGNAL_NOISE, holdings.shape)
+    empty = holdings.sum(axis=1) == 0
+    buys, _ = _orders_from_signal(np.abs(signal), prices, berries, holdings, active & empty)
+    return buys, np.zeros(holdings.shape, dtype=np.int64)
+
+
+def noise(prices, returns, berries, holdings, active, rng):
+    signal = rng.normal(0, SIGNAL_NOISE, holdings.shape)
+    return _orders_from_signal(signal, prices, berries, holdings, active)
+
+
+# name -> fn(prices, returns, berries, holdings, active, rng) -> (buys, sells)
+STRATEGIES = {
+    "momentum": momentum,
+    "contrarian": contrarian,
+    "hold": hold,
+    "noise": noise,
+}
+
+
+class Shard:
+    def __init__(self, traders, n_stocks, strategy_mix, seed_seq):
+        self.rng = np.random.default_rng(seed_seq)
+        names = list(strategy_mix)
+        weights = np.array([strategy_mix[name] for name in names], dtype=np.float64)
+        self.strategy_names = names
+        self.strategy = self.rng.choice(len(names), size=traders, p=weights / weights.sum())
+        self.berries = np.full(traders, float(INITIAL_BERRIES))
+        self.holdings = np.zeros((traders, n_stocks), dtype=np.int64)
+
+    def step(self, prices, returns):
+        active = self.rng.random(len(self.berries)) < ACTIVITY
+        buys = np.zeros(self.holdings.shape, dtype=np.int64)
+        sells = np.zeros(self.holdings.shape, dtype=np.int64)
+        for i, name in enumerate(self.strategy_names):
+            members = self.strategy == i
+            if not members.any():
+                continue
+            buys[members], sells[members] = STRATEGIES[name](
+                prices, returns, self.berries[members], self.holdings[members], active[members], self.rng
+            )
+
+        # Can't sell what isn't held, and buys are trimmed to what Berries cover
+        sells = np.minimum(sells, self.holdings)
+        self.berries += sells @ prices
+        self.holdings -= sells
+
+        cost = buys @ prices
+        over = cost > self.berries
+        if over.any():
+            buys[over] = np.floor(buys[over] * (self.berries[over] / cost[over])[:, None])
+        self.berries -= buys @ prices
+        self.holdings += buys
+
+        return buys.sum(axis=0), sells.sum(axis=0)
+
+    def summary(self, prices):
+        net_worth = self.berries + self.holdings @ prices
+        return {
+            name: (int(np.count_nonzero(self.strategy == i)), float(net_worth[self.strategy == i].sum()))
+            for i, name in enumerate(self.strategy_names)
+        }
+
+
+def _shard_worker(connection, traders, n_stocks, strategy_mix, seed_seq):
+    shard = Shard(traders, n_stocks, strategy_mix, seed_seq)
+    while True:
+        command, *args = connection.recv()
+        if command == "step":
+            connection.send(shard.step(*args))
+        elif command == "summary":
+            connection.send(shard.summary(*args))
+        elif command == "stop":
+            break
+    connection.close()
+
+
+def _send(connection, process, message):
+    try:
+        connection.send(message)
+    except (BrokenPipeError, OSError) as e:
+        raise RuntimeError(f"Shard process {process.pid} exited unexpectedly (exit code {process.exitcode})") from e
+
+
+def _recv(connection, process):
+    try:
+        return connection.recv()
+    except EOFError as e:
+        process.join(timeout=1)
+        raise RuntimeError(f"Shard process {process.pid} exited unexpectedly (exit code {process.exitcode})") from e
+
+
+def run_market(traders, chapters, shards=None, strategy_mix=None, model="gpt", seed=0,
+               starting_stocks=STARTING_STOCKS):
+    shards = shards or os.cpu_count()
+    strategy_mix = strategy_mix or {name: 1 for name in STRATEGIES}
+    price_fn = PRICE_MODELS[model]
+
+    prices = np.array([price for _, price, _ in starting_stocks], dtype=np.float64)
+    circulations = np.array([circulation for _, _, circulation in starting_stocks], dtype=np.float64)
+    returns = np.zeros(len(prices))
+
+    seed_seqs = np.random.SeedSequence(seed).spawn(shards)
+    sizes = [traders // shards + (1 if i < traders % shards else 0) for i in range(shards)]
+    connections, processes = [], []
+    for size, seed_seq in zip(sizes, seed_seqs):
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_shard_worker, args=(child, size, len(prices), strategy_mix, seed_seq), daemon=True
+        )
+        process.start()
+        # Only the shard keeps the child end open, so its death shows up here as EOFError instead of a hang
+        child.close()
+        connections.append(parent)
+        processes.append(process)
+
+    price_path = [prices.copy()]
+    volume_path = []
+    try:
+        for _ in range(chapters):
+            for connection, process in zip(connections, processes):
+                _send(connection, process, ("step", prices, returns))
+            # Merge step: the only data crossing processes is per-stock totals
+            bought = np.zeros(len(prices))
+            sold = np.zeros(len(prices))
+            for connection, process in zip(connections, processes):
+                shard_bought, shard_sold = _recv(connection, process)
+                bought += shard_bought
+                sold += shard_sold
+
+            new_prices = price_fn(prices, circulations, bought, sold)
+            circulations += bought - sold
+            returns = np.log(new_prices / prices)
+            prices = new_prices
+            price_path.append(prices.copy())
+            volume_path.append((bought, sold))
+
+        summary = {}
+        for connection, process in zip(connections, processes):
+            _send(connection, process, ("summary", prices))
+        for connection, process in zip(connections, processes):
+            for name, (count, worth) in _recv(connection, process).items():
+                total_count, total_worth = summary.get(name, (0, 0.0))
+                summary[name] = (total_count + count, total_worth + worth)
+    finally:
+        for connection in connections:
+            try:
+                connection.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass  # shard already gone
+            connection.close()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    return np.array(price_path), volume_path, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent-based trader simulation over the price models")
+    parser.add_argument("--traders", type=int, default=20000)
+    parser.add_argument("--chapters", type=int, default=30)
+    parser.add_argument("--shards", type=int, default=os.cpu_count())
+    parser.add_argument("--model", choices=PRICE_MODELS, default="gpt")
+    parser.add_argument("--mix", nargs="*", default=[], metavar="STRATEGY=WEIGHT",
+                        help=f"strategy weights, from: {', '.join(STRATEGIES)} (default: equal)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    strategy_mix = {}
+    for spec in args.mix:
+        name, _, weight = spec.partition("=")
+        if name not in STRATEGIES:
+            raise SystemExit(f"Unknown strategy '{name}', expected one of: {', '.join(STRATEGIES)}")
+        strategy_mix[name] = float(weight)
+
+    try:
+        price_path, _, summary = run_market(args.traders, args.chapters, args.shards, strategy_mix or None, args.model, args.seed)
+    except RuntimeError as e:
+        raise SystemExit(f"Error: {e}")
+
+    print(f"\n{args.traders} traders over {args.chapters} chapters ({args.shards} shards, model {args.model})")
+    print("----------------------------------------")
+    for (name, _, _), start, end in zip(STARTING_STOCKS, price_path[0], price_path[-1]):
+        print(f"{name:10} {start:10.2f} -> {end:12.2f} Berries ({(end - start) / start * 100:+.2f}%)")
+    print()
+    for name, (count, worth) in summary.items():
+        print(f"{name:10} {count:7} traders  avg net worth: {worth / max(count, 1):12.2f} Berries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import numpy as np
+
+from trials import load_trial
+
+# Vectorized versions of the per-stock price models in 2.py and 3.py.
+# Every function takes arrays (or anything np.asarray accepts) of current prices,
+# previous circulations, buys and sells for all stocks and returns the new prices
+# in one call. The operations are kept in the same order as the scalar versions
+# so results match them.
+
+
+def _as_arrays(current_price, prev_circulation, bought_this_chap, sold_this_chap):
+    return np.broadcast_arrays(
+        np.asarray(current_price, dtype=np.float64),
+        np.asarray(prev_circulation, dtype=np.float64),
+        np.asarray(bought_this_chap, dtype=np.float64),
+        np.asarray(sold_this_chap, dtype=np.float64),
+    )
+
+
+# Batch version of calculate_price_update in 2.py
+def batch_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap):
+    price, circulation, bought, sold = _as_arrays(current_price, prev_circulation, bought_this_chap, sold_this_chap)
+
+    total_volume = bought + sold
+    traded = total_volume != 0
+    # Zero volume stocks keep their price, the division result for them is thrown away
+    safe_volume = np.where(traded, total_volume, 1)
+
+    effective_circulation = np.maximum(circulation, 1)
+    buy_pressure = (bought - sold) / safe_volume
+
+    volume_ratio = total_volume / effective_circulation
+    volume_impact = np.log(1 + volume_ratio) * 2
+
+    price_dampener = 1 / (1 + np.log(1 + price / 100))
+    percent_change = buy_pressure * volume_impact * price_dampener * 100
+
+    max_change_percent = 300 / (1 + np.log(1 + price / 50))
+    percent_change = np.maximum(np.minimum(percent_change, max_change_percent), -max_change_percent)
+
+    new_price = np.maximum(price * (1 + percent_change / 100), 0.01)
+    return np.where(traded, new_price, price)
+
+
+# Batch version of gpt_calculate_price_update in 2.py
+def batch_gpt_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap):
+    price, circulation, bought, sold = _as_arrays(current_price, prev_circulation, bought_this_chap, sold_this_chap)
+
+    total_volume = bought + sold
+    traded = total_volume != 0
+    safe_volume = np.where(traded, total_volume, 1)
+
+    epsilon = 1e-6
+    has_circulation = circulation > 0
+    effective_circulation = np.where(has_circulation, circulation, epsilon)
+
+    buy_pressure = (bought - sold) / safe_volume
+
+    volume_ratio = total_volume / effective_circulation
+    volume_impact = np.log(1 + volume_ratio) * 2
+
+    # Illiquid stocks get the full effect, same as the scalar version
+    price_dampener = np.where(
+        has_circulation,
+        1 / (1 + np.log(1 + np.where(has_circulation, circulation, 0) / 100)),
+        1,
+    )
+    percent_change = buy_pressure * volume_impact * price_dampener * 100
+
+    max_change_percent = 300 / (1 + np.log(1 + price / 50))
+    percent_change = np.maximum(np.minimum(percent_change, max_change_percent), -max_change_percent)
+
+    new_price = price * (1 + percent_change / 100)
+
+    new_circulation = circulation + bought - sold
+    circulation_factor = new_circulation / effective_circulation
+    new_price = new_price * circulation_factor
+
+    new_price = np.maximum(new_price, 0.01)
+    return np.where(traded, new_price, price)
+
+
+_three = load_trial(3)
+
+
+# Batch version of the asymmetric calculate_price_update in 3.py, with the same
+# tuning knobs (defaults are 3.py's constants)
+def batch_asymmetric_price_update(current_price, prev_circulation, bought_this_chap, sold_this_chap,
+                                  max_change=_three.MAX_CHANGE, cap_price_scale=_three.CAP_PRICE_SCALE,
+                                  dampener_price_scale=_three.DAMPENER_PRICE_SCALE, drop_threshold=_three.DROP_THRESHOLD,
+                                  drop_cap_factor=_three.DROP_CAP_FACTOR, price_floor=_three.PRICE_FLOOR):
+    price, circulation, bought, sold = _as_arrays(current_price, prev_circulation, bought_this_chap, sold_this_chap)
+
+    total_volume = bought + sold
+    traded = total_volume != 0
+    safe_volume = np.where(traded, total_volume, 1)
+
+    effective_circulation = np.maximum(circulation, 1)
+    buy_pressure = (bought - sold) / safe_volume
+
+    volume_ratio = total_volume / effective_circulation
+    volume_impact = np.log(1 + volume_ratio) * 2
+
+    # Same dampener and base cap on both sides, only the multipliers differ
+    price_dampener = 1 / (1 + np.log(1 + price / dampener_price_scale))
+    base_cap = max_change / (1 + np.log(1 + price / cap_price_scale))
+    rising = buy_pressure >= 0
+
+    # Rises: cap grows with volume_ratio once it passes 1
+    extra_rise_factor = np.where(volume_ratio > 1, volume_ratio, 1)
+    max_rise_percent = base_cap * extra_rise_factor
+    rise_percent = np.minimum(buy_pressure * volume_impact * price_dampener * 100, max_rise_percent)
+
+    # Drops: extra penalty if >50% of trades are sells, with a 20% larger cap
+    sell_ratio = sold / safe_volume
+    drop_multiplier = 1 + np.maximum(0, sell_ratio - drop_threshold)
+    max_drop_percent = base_cap * drop_cap_factor
+    drop_percent = np.maximum(buy_pressure * volume_impact * price_dampener * 100 * drop_multiplier, -max_drop_percent)
+
+    percent_change = np.where(rising, rise_percent, drop_percent)
+    new_price = np.maximum(price * (1 + percent_change / 100), price_floor)
+    return np.where(traded, new_price, price)
+
+
+# Advances many stocks through many chapters at once. bought/sold are
+# (chapters, stocks) arrays of per-chapter activity; returns the price and
+# circulation trajectories as (chapters + 1, stocks) arrays, row 0 being the
+# starting state. Circulation doesn't depend on price so it is one cumsum; only
+# the price recurrence needs a Python-level loop, once per chapter rather than
+# once per stock per chapter.
+def fast_forward(current_price, prev_circulation, bought, sold, price_fn=batch_gpt_price_update, **params):
+    bought = np.atleast_2d(np.asarray(bought, dtype=np.float64))
+    sold = np.atleast_2d(np.asarray(sold, dtype=np.float64))
+    chapters, n = bought.shape
+
+    circulations = np.empty((chapters + 1, n), dtype=np.float64)
+    circulations[0] = prev_circulation
+    np.cumsum(bought - sold, axis=0, out=circulations[1:])
+    circulations[1:] += circulations[0]
+
+    prices = np.empty((chapters + 1, n), dtype=np.float64)
+    prices[0] = current_price
+    for chapter in range(chapters):
+        prices[chapter + 1] = price_fn(prices[chapter], circulations[chapter], bought[chapter], sold[chapter], **params)
+
+    return prices, circulations
+
+
+# Batch replacement for calling Stock.update_price (2.py) on every stock in a list.
+# Updates the objects in place and returns the percent changes as an array.
+def update_stocks(stocks, price_fn=batch_gpt_price_update):
+    prices = np.fromiter((stock.price for stock in stocks), dtype=np.float64, count=len(stocks))
+    circulations = np.fromiter((stock.circulation for stock in stocks), dtype=np.float64, count=len(stocks))
+    bought = np.fromiter((stock.bought_this_chap for stock in stocks), dtype=np.float64, count=len(stocks))
+    sold = np.fromiter((stock.sold_this_chap for stock in stocks), dtype=np.float64, count=len(stocks))
+
+    new_prices = price_fn(prices, circulations, bought, sold)
+
+    for stock, price in zip(stocks, new_prices.tolist()):
+        stock.price = price
+        stock.circulation += stock.bought_this_chap - stock.sold_this_chap
+        stock.bought_this_chap = 0
+        stock.sold_this_chap = 0
+
+    return (new_prices - prices) / prices * 100
+
+
+if __name__ == "__main__":
+    # Quick check against the scalar versions on random stocks
+    two = load_trial(2)
+    three = load_trial(3)
+
+    rng = np.random.default_rng(0)
+    n = 100000
+    prices = rng.uniform(1, 5000, n)
+    circulations = rng.integers(0, 2000, n).astype(np.float64)
+    bought = rng.integers(0, 500, n).astype(np.float64)
+    sold = rng.integers(0, 500, n).astype(np.float64)
+    bought[::7] = 0
+    sold[::7] = 0
+
+    checks = [
+        ("calculate_price_update (2.py)", two.calculate_price_update, batch_price_update),
+        ("gpt_calculate_price_update (2.py)", two.gpt_calculate_price_update, batch_gpt_price_update),
+        ("calculate_price_update (3.py)", three.calculate_price_update, batch_asymmetric_price_update),
+    ]
+    for name, scalar_fn, batch_fn in checks:
+        expected = np.array([scalar_fn(*args) for args in zip(prices.tolist(), circulations.tolist(), bought.tolist(), sold.tolist())])
+        got = batch_fn(prices, circulations, bought, sold)
+        print(f"{name:36} max relative difference: {np.max(np.abs(got - expected) / np.abs(expected)):.3e}")
+
+    # fast_forward against repeated Stock.update_price
+    chapters = 200
+    stocks = [two.Stock(f"s{i}", price, circulation) for i, (price, circulation) in enumerate(zip(prices[:50].tolist(), circulations[:50].tolist()))]
+    chapter_bought = rng.integers(0, 100, (chapters, len(stocks))).astype(np.float64)
+    chapter_sold = rng.integers(0, 100, (chapters, len(stocks))).astype(np.float64)
+    path, _ = fast_forward(prices[:50], circulations[:50], chapter_bought, chapter_sold)
+    for chapter in range(chapters):
+        for i, stock in enumerate(stocks):
+            stock.bought_this_chap = chapter_bought[chapter, i]
+            stock.sold_this_chap = chapter_sold[chapter, i]
+            stock.update_price()
+    expected = np.array([stock.price for stock in stocks])
+    print(f"{'fast_forward, ' + str(chapters) + ' chapters':36} max relative difference: {np.max(np.abs(path[-1] - expected) / np.abs(expected)):.3e}")
@@ -0,0 +1,201 @@
+import argparse
+import copy
+import datetime
+import gc
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+import batch
+from trials import load_trial
+
+# Microbenchmarks for every pricing model in stocktrials. Each model is timed per
+# call over a set of input cases (including the zero-volume / zero-circulation
+# early-return paths) and per batch over a whole market's worth of stocks.
+# Like timeit.Timer.autorange, every sample repeats the run until it has taken at
+# least MIN_SAMPLE_TIME, with the garbage collector off, and the best of REPEATS
+# samples is kept along with how far the median sits above it (the spread).
+# Results are written as JSON; --compare fails the run if any timing got slower
+# than a previous run by more than --threshold, or more than twice either run's
+# spread when that is larger, so noisy entries don't fail on noise alone.
+
+one = load_trial(1)
+two = load_trial(2)
+three = load_trial(3)
+
+CALLS = 2000  # inputs per per-call case
+BATCH_SIZE = 10000  # stocks per batch case
+REPEATS = 7
+MIN_SAMPLE_TIME = 0.05  # seconds of timed runs per sample
+NOISE_FLOOR = 50e-9  # timings under this (per call) are too small to compare
+
+
+# Seconds per run for one sample: repeats run() until min_time has been spent
+# in it; prepare() builds fresh input outside the timed section
+def sample(prepare, run, min_time=MIN_SAMPLE_TIME):
+    elapsed, runs = 0.0, 0
+    while elapsed < min_time:
+        data = prepare()
+        start = time.perf_counter()
+        run(data)
+        elapsed += time.perf_counter() - start
+        runs += 1
+    return elapsed / runs
+
+
+# {key: (best, median)} seconds per run. Samples are taken round-robin over all
+# benchmarks rather than back to back, so a stretch where the machine is busy
+# costs every benchmark one slow sample instead of all of one benchmark's.
+def measure(benchmarks, repeats=REPEATS):
+    samples = {key: [] for key in benchmarks}
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            for key, (prepare, run) in benchmarks.items():
+                samples[key].append(sample(prepare, run))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {key: (min(times), sorted(times)[len(times) // 2]) for key, times in samples.items()}
+
+
+# Inputs for the 2.py/3.py models: (current_price, prev_circulation, bought, sold)
+def chapter_inputs(rng, count, case):
+    inputs = []
+    for _ in range(count):
+        price = rng.uniform(10, 5000)
+        circulation = rng.randint(1, 2000)
+        bought = rng.randint(0, 500)
+        sold = rng.randint(0, 500)
+        if case == "zero_volume":
+            bought = sold = 0
+        elif case == "zero_circulation":
+            circulation = 0
+        elif case == "buy_heavy":
+            sold = rng.randint(0, bought // 4 + 1)
+        elif case == "sell_heavy":
+            bought = rng.randint(0, sold // 4 + 1)
+        inputs.append((price, circulation, bought, sold))
+    return inputs
+
+
+# Inputs for the 1.py model: stock dicts like the `stocks` table there
+def stock_dicts(rng, count, case):
+    stocks = {}
+    for i in range(count):
+        price = rng.uniform(10, 5000)
+        data = {"price": price, "bought": rng.randint(0, 500), "sold": rng.randint(0, 500), "baseline": price * 100}
+        if case == "zero_volume":
+            data["bought"] = data["sold"] = 0
+        elif case == "zero_baseline":
+            data["baseline"] = 0
+        stocks[f"stock{i}"] = data
+    return stocks
+
+
+CHAPTER_CASES = ("typical", "buy_heavy", "sell_heavy", "zero_volume", "zero_circulation")
+STOCK_CASES = ("typical", "zero_volume", "zero_baseline")
+
+CHAPTER_MODELS = {
+    "2.py:calculate_price_update": (two.calculate_price_update, batch.batch_price_update),
+    "2.py:gpt_calculate_price_update": (two.gpt_calculate_price_update, batch.batch_gpt_price_update),
+    "3.py:calculate_price_update": (three.calculate_price_update, batch.batch_asymmetric_price_update),
+}
+
+
+def run_benchmarks(seed=0):
+    rng = random.Random(seed)
+    benchmarks = {}
+    per_call = {}
+
+    # Benchmarks run later, so the lambdas bind their loop variables as defaults
+    def record(key, prepare, run, per=1):
+        benchmarks[key] = (prepare, run)
+        per_call[key] = per
+
+    # seconds per call / per batch, keyed "model/case/kind"
+    for case in STOCK_CASES:
+        stocks = stock_dicts(rng, CALLS, case)
+        rows = list(stocks.values())
+        record(f"1.py:calculate_price_change/{case}/call",
+               lambda rows=rows: rows, lambda rows: [one.calculate_price_change(data) for data in rows], per=CALLS)
+
+        stocks = stock_dicts(rng, BATCH_SIZE, case)
+        record(f"1.py:update_stock_prices/{case}/batch", lambda stocks=stocks: copy.deepcopy(stocks), one.update_stock_prices)
+
+    for name, (scalar_fn, batch_fn) in CHAPTER_MODELS.items():
+        for case in CHAPTER_CASES:
+            inputs = chapter_inputs(rng, CALLS, case)
+            record(f"{name}/{case}/call",
+                   lambda inputs=inputs: inputs, lambda inputs, fn=scalar_fn: [fn(*args) for args in inputs], per=CALLS)
+
+            inputs = chapter_inputs(rng, BATCH_SIZE, case)
+            record(f"{name}/{case}/batch", lambda inputs=inputs: inputs, lambda inputs, fn=scalar_fn: [fn(*args) for args in inputs])
+            arrays = [np.array(column, dtype=np.float64) for column in zip(*inputs)]
+            record(f"{name}/{case}/vectorized", lambda arrays=arrays: arrays, lambda arrays, fn=batch_fn: fn(*arrays))
+
+    results, spread = {}, {}
+    for key, (best, median) in measure(benchmarks).items():
+        results[key] = best / per_call[key]
+        spread[key] = median / best - 1
+    return results, spread
+
+
+# Timings that got slower than the baseline by more than threshold (0.2 = 20%),
+# or by more than twice the measured spread of either run if that is larger
+def regressions(results, baseline, threshold, spread=None, baseline_spread=None):
+    slower = {}
+    for key, seconds in results.items():
+        old = baseline.get(key)
+        if not old or max(old, seconds) < NOISE_FLOOR:
+            continue
+        noise = 2 * max((spread or {}).get(key, 0), (baseline_spread or {}).get(key, 0))
+        if seconds > old * (1 + max(threshold, noise)):
+            slower[key] = (old, seconds)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stocktrials pricing models")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing (default 0.2 = 20%%)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results, spread = run_benchmarks(args.seed)
+
+    print(f"{'benchmark':60} {'time':>12} {'spread':>8}")
+    print("-" * 82)
+    for key, seconds in results.items():
+        print(f"{key:60} {seconds * 1e6:10.2f}us {spread[key]:8.1%}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "results": results,
+                "spread": spread,
+            }, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        slower = regressions(results, baseline["results"], args.threshold, spread, baseline.get("spread"))
+        if slower:
+            print(f"\n{len(slower)} benchmark(s) slower than {args.compare} by more than {args.threshold:.0%}:")
+            for key, (old, new) in slower.items():
+                print(f"{key:60} {old * 1e6:10.2f}us -> {new * 1e6:10.2f}us ({new / old - 1:+.0%})")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import numpy as np
+
+from batch import batch_gpt_price_update, fast_forward
+
+# Struct-of-arrays market state. Instead of a dict per character (1.py) or a
+# Stock object per character (2.py), every field lives in one contiguous array
+# and a name -> index map finds a character's row. The pricing functions in
+# batch.py run directly on views of these arrays.
+
+FIELDS = ("price", "circulation", "bought", "sold", "baseline")
+
+
+class MarketBook:
+    def __init__(self, capacity=16, dtype=np.float64):
+        self.names = []
+        self.index = {}
+        self._arrays = {field: np.zeros(capacity, dtype=dtype) for field in FIELDS}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    # Zero-copy views over the live rows; writes go straight into the book
+    @property
+    def price(self):
+        return self._arrays["price"][:len(self.names)]
+
+    @property
+    def circulation(self):
+        return self._arrays["circulation"][:len(self.names)]
+
+    @property
+    def bought(self):
+        return self._arrays["bought"][:len(self.names)]
+
+    @property
+    def sold(self):
+        return self._arrays["sold"][:len(self.names)]
+
+    @property
+    def baseline(self):
+        return self._arrays["baseline"][:len(self.names)]
+
+    def _grow(self):
+        # Double the capacity so adds stay amortized O(1)
+        for field, array in self._arrays.items():
+            grown = np.zeros(max(len(array) * 2, 16), dtype=array.dtype)
+            grown[:len(array)] = array
+            self._arrays[field] = grown
+
+    def add(self, name, price, circulation=0, baseline=None):
+        if name in self.index:
+            raise ValueError(f"'{name}' is already in the book")
+        row = len(self.names)
+        if row == len(self._arrays["price"]):
+            self._grow()
+
+        self._arrays["price"][row] = price
+        self._arrays["circulation"][row] = circulation
+        self._arrays["bought"][row] = 0
+        self._arrays["sold"][row] = 0
+        # Same default as the stocks table in 1.py: expected spending is price * 100
+        self._arrays["baseline"][row] = price * 100 if baseline is None else baseline
+
+        self.index[name] = row
+        self.names.append(name)
+        return row
+
+    def remove(self, name):
+        # Move the last row into the hole so the live rows stay contiguous
+        row = self.index.pop(name)
+        last = len(self.names) - 1
+        if row != last:
+            last_name = self.names[last]
+            for array in self._arrays.values():
+                array[row] = array[last]
+            self.names[row] = last_name
+            self.index[last_name] = row
+        self.names.pop()
+
+    def get(self, name):
+        row = self.index[name]
+        return {field: self._arrays[field][row].item() for field in FIELDS}
+
+    def record(self, name, bought=0, sold=0):
+        row = self.index[name]
+        self._arrays["bought"][row] += bought
+        self._arrays["sold"][row] += sold
+
+    def reset_chapter(self):
+        self.bought[:] = 0
+        self.sold[:] = 0
+
+    # Close a chapter with one of the batch.py models, like Stock.update_price
+    # does for a single stock. Returns the percent changes.
+    def close_chapter(self, price_fn=batch_gpt_price_update):
+        old_prices = self.price.copy()
+        self.price[:] = price_fn(self.price, self.circulation, self.bought, self.sold)
+        self.circulation[:] += self.bought - self.sold
+        self.reset_chapter()
+        return (self.price - old_prices) / old_prices * 100
+
+    # Run many chapters at once; bought/sold are (chapters, len(book)) arrays in
+    # row order. Leaves the book at the final state and returns the
+    # (chapters + 1, len(book)) price and circulation trajectories.
+    def fast_forward(self, bought, sold, price_fn=batch_gpt_price_update, **params):
+        prices, circulations = fast_forward(self.price, self.circulation, bought, sold, price_fn, **params)
+        self.price[:] = prices[-1]
+        self.circulation[:] = circulations[-1]
+        self.reset_chapter()
+        return prices, circulations
+
+    # Build a book from the 1.py `stocks` dict
+    @classmethod
+    def from_stock_dict(cls, stocks, **kwargs):
+        book = cls(capacity=max(len(stocks), 16), **kwargs)
+        for name, data in stocks.items():
+            row = book.add(name, data["price"], baseline=data["baseline"])
+            book._arrays["bought"][row] = data["bought"]
+            book._arrays["sold"][row] = data["sold"]
+        return book
+
+    # Build a book from a list of 2.py Stock objects
+    @classmethod
+    def from_stocks(cls, stocks, **kwargs):
+        book = cls(capacity=max(len(stocks), 16), **kwargs)
+        for stock in stocks:
+            row = book.add(stock.name, stock.price, stock.circulation)
+            book._arrays["bought"][row] = stock.bought_this_chap
+            book._arrays["sold"][row] = stock.sold_this_chap
+        return book
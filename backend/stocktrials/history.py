@@ -0,0 +1,155 @@
+import json
+import os
+
+import numpy as np
+
+# Price history store for simulation output. One file holds a chapter x stock
+# matrix per field (price, circulation, buys, sells), each stored as its own
+# contiguous block after a small JSON header with the stock names and chapter
+# range. Files are opened with np.memmap, so slicing one stock or a range of
+# chapters only reads the pages involved instead of loading the whole file.
+#
+# Layout: MAGIC, the data offset as a little-endian uint64, the JSON header
+# space-padded up to the data offset (it is rewritten in place as chapters are
+# filled in), then the field blocks.
+
+MAGIC = b"SPHIST01"
+PREFIX = len(MAGIC) + 8
+HEADER_ALIGN = 4096
+FIELDS = ("price", "circulation", "bought", "sold")
+
+
+class PriceHistory:
+    def __init__(self, path, header, mode):
+        self.path = path
+        self.header = header
+        self.stocks = header["stocks"]
+        self.index = {name: i for i, name in enumerate(self.stocks)}
+        self.first_chapter = header["first_chapter"]
+        self.chapters = header["chapters"]
+        self.dtype = np.dtype(header["dtype"])
+
+        shape = (self.chapters, len(self.stocks))
+        block = self.dtype.itemsize * shape[0] * shape[1]
+        self.arrays = {
+            field: np.memmap(path, dtype=self.dtype, mode=mode, offset=header["data_offset"] + i * block, shape=shape)
+            for i, field in enumerate(header["fields"])
+        }
+
+    @classmethod
+    def create(cls, path, stocks, first_chapter, chapters, fields=FIELDS, dtype=np.float64):
+        header = {
+            "stocks": list(stocks),
+            "first_chapter": first_chapter,
+            "chapters": chapters,
+            "written": 0,
+            "fields": list(fields),
+            "dtype": np.dtype(dtype).str,
+        }
+        # Room for the header plus slack so later rewrites of "written" still fit
+        encoded = json.dumps(header).encode()
+        header_size = (PREFIX + len(encoded) + 64 + HEADER_ALIGN - 1) // HEADER_ALIGN * HEADER_ALIGN
+        header["data_offset"] = header_size
+        size = header_size + len(fields) * chapters * len(header["stocks"]) * np.dtype(dtype).itemsize
+
+        with open(path, "wb") as file:
+            file.truncate(size)  # sparse on most filesystems until written
+        history = cls(path, header, "r+")
+        history._write_header()
+        return history
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"'{path}' is not a price history file")
+            data_offset = int.from_bytes(file.read(8), "little")
+            # The header is padded with spaces, json.loads ignores them
+            header = json.loads(file.read(data_offset - PREFIX))
+        return cls(path, header, mode)
+
+    def _write_header(self):
+        encoded = json.dumps(self.header).encode()
+        data_offset = self.header["data_offset"]
+        if len(encoded) > data_offset - PREFIX:
+            raise ValueError("Header grew past its reserved space")
+        with open(self.path, "r+b") as file:
+            file.write(MAGIC + data_offset.to_bytes(8, "little") + encoded.ljust(data_offset - PREFIX, b" "))
+
+    def _row(self, chapter):
+        row = chapter - self.first_chapter
+        if not 0 <= row < self.chapters:
+            raise IndexError(f"Chapter {chapter} is outside {self.first_chapter}-{self.first_chapter + self.chapters - 1}")
+        return row
+
+    @property
+    def written(self):
+        return self.header["written"]
+
+    # One chapter: each field is a vector over stocks in header order
+    def write_chapter(self, chapter, **values):
+        row = self._row(chapter)
+        for field, value in values.items():
+            self.arrays[field][row] = value
+        self.header["written"] = max(self.header["written"], row + 1)
+
+    # Many chapters at once, e.g. the trajectories from batch.fast_forward
+    def write_block(self, start_chapter, **values):
+        row = self._row(start_chapter)
+        for field, value in values.items():
+            value = np.asarray(value)
+            self.arrays[field][row:row + len(value)] = value
+            self.header["written"] = max(self.header["written"], row + len(value))
+
+    def flush(self):
+        for array in self.arrays.values():
+            array.flush()
+        self._write_header()
+
+    def close(self):
+        if self.arrays and next(iter(self.arrays.values())).mode != "r":
+            self.flush()
+        self.arrays = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # One stock's series over a chapter range (end exclusive), as a memmap view
+    def stock(self, name, field="price", start=None, end=None):
+        start_row = 0 if start is None else self._row(start)
+        end_row = self.written if end is None else self._row(end - 1) + 1
+        return self.arrays[field][start_row:end_row, self.index[name]]
+
+    # A chapter range for all stocks (end exclusive), as a memmap view
+    def chapter_range(self, start, end=None, field="price"):
+        end_row = self.written if end is None else self._row(end - 1) + 1
+        return self.arrays[field][self._row(start):end_row]
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from batch import fast_forward
+
+    # Write a fast_forward run and read slices back
+    rng = np.random.default_rng(0)
+    n, chapters = 2000, 1000
+    bought = rng.poisson(20, (chapters, n))
+    sold = rng.poisson(20, (chapters, n))
+    prices, circulations = fast_forward(rng.uniform(10, 1000, n), np.full(n, 500.0), bought, sold)
+
+    path = os.path.join(tempfile.mkdtemp(), "history.sph")
+    start = time.perf_counter()
+    with PriceHistory.create(path, [f"stock{i}" for i in range(n)], 1000, chapters + 1) as history:
+        history.write_block(1000, price=prices, circulation=circulations)
+        history.write_block(1001, bought=bought, sold=sold)
+    print(f"wrote {os.path.getsize(path) / 1e6:.1f} MB in {time.perf_counter() - start:.3f}s")
+
+    with PriceHistory.open(path) as history:
+        assert np.array_equal(history.stock("stock42"), prices[:, 42])
+        assert np.array_equal(history.chapter_range(1500, 1510, "circulation"), circulations[500:510])
+        print(f"{history.written} chapters x {len(history.stocks)} stocks, slices match")
@@ -0,0 +1,249 @@
+import json
+
+import numpy as np
+
+# Portfolio valuation and leaderboard for every user at once, the Python side of
+# getTopUsersByStockValue (backend/src/controllers/user.controllers.js). All
+# users' ownedStocks are held as a sparse user x stock matrix in coordinate form
+# (one entry per user/stock pair), so revaluing every portfolio against a price
+# vector is one weighted bincount, i.e. a sparse matrix-vector product.
+#
+# Small changes don't need a full revalue: update_prices() only touches the
+# holders of the stocks that moved, found through a per-stock (CSC-style) index
+# of the entries, set_holding() only the one user, and the top-k is refreshed from
+# the previous top-k plus the users marked in a changed-since mask.
+
+ORDERS = ("accountValue", "stockValue", "totalValue")
+
+
+def _object_id(value):
+    # mongoexport writes ObjectIds as {"$oid": "..."}
+    return value["$oid"] if isinstance(value, dict) else str(value)
+
+
+# [(value, row), ...] for the k largest values among rows, best first:
+# partition out the k largest, then sort just those
+def _largest(values, rows, k):
+    if k < len(rows):
+        rows = rows[np.argpartition(-values[rows], k - 1)[:k]]
+    rows = rows[np.argsort(-values[rows], kind="stable")]
+    return [(values[row], row) for row in rows.tolist()]
+
+
+class PortfolioEngine:
+    def __init__(self, users, stocks, account_values, capacity=1024):
+        self.users = list(users)
+        self.user_index = {user: i for i, user in enumerate(self.users)}
+        self.stocks = list(stocks)
+        self.stock_index = {stock: i for i, stock in enumerate(self.stocks)}
+
+        self.prices = np.zeros(len(self.stocks))
+        self.account_value = np.asarray(account_values, dtype=np.float64).copy()
+        self.stock_value = np.zeros(len(self.users))
+
+        # Holdings in coordinate form, grown by doubling like MarketBook
+        self.nnz = 0
+        self._user = np.zeros(capacity, dtype=np.int64)
+        self._stock = np.zeros(capacity, dtype=np.int64)
+        self._quantity = np.zeros(capacity, dtype=np.float64)
+        self._entry = {}  # (user row, stock column) -> entry
+
+        # Entries sorted by stock: the holders of column c are _by_stock[_stock_start[c]:_stock_start[c + 1]].
+        # Built for the first _indexed entries; newer ones are scanned until there are enough to rebuild.
+        self._by_stock = np.zeros(0, dtype=np.int64)
+        self._stock_start = np.zeros(len(self.stocks) + 1, dtype=np.int64)
+        self._indexed = 0
+
+        # order -> (k, [(value, user row), ...], bool mask of rows changed since) from the last top() call
+        self._top = {}
+
+    # Users from a mongoexport JSONL of the User collection
+    @classmethod
+    def from_user_export(cls, path, stocks=None):
+        users, account_values, holdings = [], [], []
+        with open(path) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                users.append(document.get("username", _object_id(document["_id"])))
+                account_values.append(document.get("accountValue", 0))
+                for owned in document.get("ownedStocks", []):
+                    holdings.append((users[-1], _object_id(owned["stock"]), owned.get("quantity") or 0))
+
+        stocks = list(stocks) if stocks is not None else sorted({stock for _, stock, _ in holdings})
+        engine = cls(users, stocks, account_values, capacity=max(len(holdings), 1024))
+        for user, stock, quantity in holdings:
+            engine.add_holding(user, stock, quantity)
+        return engine
+
+    @property
+    def total_value(self):
+        return self.account_value + self.stock_value
+
+    def values(self, order_by="totalValue"):
+        if order_by == "accountValue":
+            return self.account_value
+        if order_by == "stockValue":
+            return self.stock_value
+        if order_by == "totalValue":
+            return self.total_value
+        raise ValueError(f"Invalid orderBy '{order_by}', expected one of: {', '.join(ORDERS)}")
+
+    def _grow(self):
+        size = len(self._user) * 2
+        self._user = np.resize(self._user, size)
+        self._stock = np.resize(self._stock, size)
+        self._quantity = np.resize(self._quantity, size)
+
+    # Loading only: accumulates into the matrix without revaluing
+    def add_holding(self, user, stock, quantity):
+        key = (self.user_index[user], self.stock_index[stock])
+        entry = self._entry.get(key)
+        if entry is None:
+            if self.nnz == len(self._user):
+                self._grow()
+            entry = self._entry[key] = self.nnz
+            self._user[entry], self._stock[entry] = key
+            self._quantity[entry] = 0
+            self.nnz += 1
+        self._quantity[entry] += quantity
+
+    # Full mark-to-market: every portfolio against the whole price vector
+    def revalue(self, prices=None):
+        if prices is not None:
+            self.prices = np.asarray(prices, dtype=np.float64).copy()
+        n = self.nnz
+        if self._indexed != n:
+            self._index_by_stock()  # a full pass anyway, so the holder index is built here rather than in update_prices
+        self.stock_value = np.bincount(
+            self._user[:n], weights=self._quantity[:n] * self.prices[self._stock[:n]], minlength=len(self.users)
+        )
+        self._top.clear()
+        return self.stock_value
+
+    def _mark_changed(self, rows):
+        for _, _, changed in self._top.values():
+            changed[rows] = True
+
+    def _index_by_stock(self):
+        n = self.nnz
+        keys = self._stock[:n]
+        if len(self.stocks) <= np.iinfo(np.int16).max:
+            keys = keys.astype(np.int16)  # numpy radix-sorts 16-bit keys, several times faster than int64
+        self._by_stock = np.argsort(keys, kind="stable")
+        self._stock_start = np.searchsorted(self._stock[:n][self._by_stock], np.arange(len(self.stocks) + 1))
+        self._indexed = n
+
+    # Incremental: only the holders of stocks whose price moved
+    def update_prices(self, changes):
+        if self.nnz - self._indexed > max(1024, self.nnz // 8):
+            self._index_by_stock()
+        tail = np.arange(self._indexed, self.nnz)  # entries added since the index was built
+        tail_stocks = self._stock[tail]
+
+        for stock, price in changes.items():
+            column = self.stock_index[stock]
+            delta = price - self.prices[column]
+            self.prices[column] = price
+            entries = self._by_stock[self._stock_start[column]:self._stock_start[column + 1]]
+            entries = np.concatenate((entries, tail[tail_stocks == column]))
+            # A user holds a stock at most once, so the rows are unique and a plain fancy add is safe
+            users = self._user[entries]
+            self.stock_value[users] += self._quantity[entries] * delta
+            self._mark_changed(users)
+
+    # Incremental: one user's position in one stock
+    def set_holding(self, user, stock, quantity):
+        row = self.user_index[user]
+        column = self.stock_index[stock]
+        entry = self._entry.get((row, column))
+        old_quantity = 0 if entry is None else self._quantity[entry]
+        if entry is None:
+            self.add_holding(user, stock, quantity)
+        else:
+            self._quantity[entry] = quantity
+        self.stock_value[row] += (quantity - old_quantity) * self.prices[column]
+        self._mark_changed((row,))
+
+    def set_account_value(self, user, value):
+        row = self.user_index[user]
+        self.account_value[row] = value
+        self._mark_changed((row,))
+
+    # Top k as [(user, value), ...], best first
+    def top(self, k=100, order_by="totalValue"):
+        values = self.values(order_by)
+        if k <= 0 or not len(values):
+            return []
+        cached = self._top.get(order_by)
+
+        if cached is not None and cached[0] == k and cached[1] and len(cached[1]) == min(k, len(values)):
+            _, previous, changed = cached
+            cutoff = previous[-1][0]
+            # Unchanged users outside the old top-k are all <= cutoff, so the new
+            # top-k comes from the old one plus changed users, unless an old
+            # member fell below the cutoff and an unchanged user could pass it.
+            members = np.array([row for _, row in previous], dtype=np.int64)
+            if np.all(values[members] >= cutoff):
+                candidates = changed & (values > cutoff)
+                candidates[members] = True
+                candidates = np.flatnonzero(candidates)
+                return self._store_top(order_by, k, _largest(values, candidates, k))
+
+        return self._store_top(order_by, k, _largest(values, np.arange(len(values)), k))
+
+    def _store_top(self, order_by, k, best):
+        self._top[order_by] = (k, best, np.zeros(len(self.users), dtype=bool))
+        return [(self.users[row], float(value)) for value, row in best]
+
+    # 1-based rank, like currentUser.rank in the backend leaderboard
+    def rank(self, user, order_by="totalValue"):
+        values = self.values(order_by)
+        return int(np.count_nonzero(values > values[self.user_index[user]])) + 1
+
+
+if __name__ == "__main__":
+    import time
+
+    # Synthetic users to check the incremental paths against a full revalue
+    rng = np.random.default_rng(0)
+    n_users, n_stocks = 200000, 60
+    stocks = [f"stock{i}" for i in range(n_stocks)]
+    users = [f"user{i}" for i in range(n_users)]
+    engine = PortfolioEngine(users, stocks, rng.uniform(0, 10000, n_users), capacity=n_users * 5 + 1024)  # room for the holdings added below
+    for row in range(n_users):
+        for column in rng.choice(n_stocks, 5, replace=False).tolist():
+            engine.add_holding(users[row], stocks[column], int(rng.integers(1, 100)))
+
+    start = time.perf_counter()
+    engine.revalue(rng.uniform(10, 2000, n_stocks))
+    full = engine.top(100)
+    print(f"full revalue + top 100 of {n_users} users: {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    start = time.perf_counter()
+    engine.revalue()
+    engine.top(100)
+    print(f"full revalue + top 100, holder index already built: {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    start = time.perf_counter()
+    engine.update_prices({stocks[3]: 5000.0, stocks[7]: 1.0})
+    engine.top(100)
+    print(f"2 price changes + top 100: {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    start = time.perf_counter()
+    for row in rng.choice(n_users, 50, replace=False).tolist():
+        engine.set_holding(users[row], stocks[0], 500)
+    engine.top(100)
+    print(f"50 holding changes + top 100: {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    # Moves a stock whose new holders aren't in the holder index yet
+    engine.update_prices({stocks[0]: 40000.0})
+    incremental = engine.top(100)
+
+    expected_values = engine.stock_value.copy()
+    engine.revalue()
+    assert np.allclose(expected_values, engine.stock_value)
+    assert [user for user, _ in incremental] == [user for user, _ in engine.top(100)]
+    print("incremental results match a full revalue")
+    assert engine.top(0) == [] and PortfolioEngine([], stocks, []).top(10) == []
@@ -0,0 +1,225 @@
+import heapq
+from collections import deque
+
+# Limit order book per character stock, for trying a hybrid market next to the
+# chapter-close formulas. Each side keeps a heap of price levels (bids as
+# negated prices so both are min-heaps) and each level a FIFO queue of orders.
+# Orders are indexed by id: placing at a new level is O(log levels), joining an
+# existing level is O(1), and cancelling is amortized O(1): each level keeps its
+# live quantity and order count, a cancel zeroes the order and takes it off those,
+# and dead orders are popped from the front of the queue, dropped all at once when
+# the level empties, or compacted out once they outnumber the live ones. Empty
+# levels are dropped from the heaps lazily the next time best() reaches them.
+#
+# Every match produces a Fill; fill_totals() turns fills into per-stock bought /
+# sold counts that can go to MarketBook.record or the price models.
+
+
+class Order:
+    __slots__ = ("id", "stock", "side", "price", "remaining", "trader")
+
+    def __init__(self, id, stock, side, price, quantity, trader=None):
+        self.id = id
+        self.stock = stock
+        self.side = side
+        self.price = price
+        self.remaining = quantity
+        self.trader = trader
+
+
+class Fill:
+    __slots__ = ("stock", "buy_id", "sell_id", "price", "quantity")
+
+    def __init__(self, stock, buy_id, sell_id, price, quantity):
+        self.stock = stock
+        self.buy_id = buy_id
+        self.sell_id = sell_id
+        self.price = price
+        self.quantity = quantity
+
+    def __repr__(self):
+        return f"Fill({self.stock!r}, buy={self.buy_id}, sell={self.sell_id}, {self.quantity} @ {self.price})"
+
+
+class OrderBook:
+    def __init__(self, stock):
+        self.stock = stock
+        self.levels = {"buy": {}, "sell": {}}  # price -> deque of Orders
+        self.heaps = {"buy": [], "sell": []}  # heap keys: -price for bids, price for asks
+        self.live = {"buy": {}, "sell": {}}  # price -> [live quantity, live order count]
+
+    def best(self, side):
+        levels = self.levels[side]
+        live = self.live[side]
+        heap = self.heaps[side]
+        while heap:
+            price = -heap[0] if side == "buy" else heap[0]
+            if live[price][1]:
+                return price
+            # Filled or cancelled-out level, drop it now
+            heapq.heappop(heap)
+            del levels[price], live[price]
+        return None
+
+    def rest(self, order):
+        levels = self.levels[order.side]
+        queue = levels.get(order.price)
+        if queue is None:
+            queue = levels[order.price] = deque()
+            self.live[order.side][order.price] = [0, 0]
+            heapq.heappush(self.heaps[order.side], -order.price if order.side == "buy" else order.price)
+        queue.append(order)
+        live = self.live[order.side][order.price]
+        live[0] += order.remaining
+        live[1] += 1
+
+    def cancel(self, order):
+        live = self.live[order.side][order.price]
+        live[0] -= order.remaining
+        live[1] -= 1
+        order.remaining = 0
+        levels = self.levels[order.side]
+        queue = levels[order.price]
+        if not live[1]:
+            queue.clear()
+            return
+        while not queue[0].remaining:
+            queue.popleft()
+        if len(queue) > 2 * live[1]:
+            levels[order.price] = deque(resting for resting in queue if resting.remaining)
+
+    def match(self, order, orders, fills):
+        opposite = "sell" if order.side == "buy" else "buy"
+        while order.remaining > 0:
+            best = self.best(opposite)
+            if best is None or (best > order.price if order.side == "buy" else best < order.price):
+                break
+            queue = self.levels[opposite][best]
+            live = self.live[opposite][best]
+            while queue and order.remaining > 0:
+                resting = queue[0]
+                if resting.remaining == 0:
+                    queue.popleft()  # cancelled
+                    continue
+                quantity = min(order.remaining, resting.remaining)
+                # Trades happen at the resting order's price
+                if order.side == "buy":
+                    fills.append(Fill(self.stock, order.id, resting.id, best, quantity))
+                else:
+                    fills.append(Fill(self.stock, resting.id, order.id, best, quantity))
+                order.remaining -= quantity
+                resting.remaining -= quantity
+                live[0] -= quantity
+                if resting.remaining == 0:
+                    queue.popleft()
+                    live[1] -= 1
+                    del orders[resting.id]
+
+
+class MatchingEngine:
+    def __init__(self, stocks=()):
+        self.books = {stock: OrderBook(stock) for stock in stocks}
+        self.orders = {}  # id -> resting Order, across all books
+        self._next_id = 1  # kept past every integer id seen, so generated ids never collide with supplied ones
+
+    # Match a limit order and rest what's left; returns (order_id, fills)
+    def place(self, stock, side, price, quantity, trader=None, order_id=None):
+        fills = []
+        order_id = self._submit(stock, side, price, quantity, trader, order_id, fills)
+        return order_id, fills
+
+    # Process many orders in one call, collecting all fills in one list
+    def place_batch(self, orders):
+        fills = []
+        ids = [self._submit(*order, fills=fills) for order in orders]
+        return ids, fills
+
+    def _submit(self, stock, side, price, quantity, trader=None, order_id=None, fills=None):
+        if side not in ("buy", "sell"):
+            raise ValueError(f"Unknown order side '{side}'")
+        if quantity <= 0 or price <= 0:
+            raise ValueError("Order price and quantity must be positive")
+        book = self.books.get(stock)
+        if book is None:
+            book = self.books[stock] = OrderBook(stock)
+        if order_id is None:
+            order_id = self._next_id
+        elif order_id in self.orders:
+            raise ValueError(f"Order {order_id} already exists")
+        if isinstance(order_id, int) and order_id >= self._next_id:
+            self._next_id = order_id + 1
+
+        order = Order(order_id, stock, side, price, quantity, trader)
+        book.match(order, self.orders, fills)
+        if order.remaining > 0:
+            self.orders[order_id] = order
+            book.rest(order)
+        return order_id
+
+    def cancel(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return False
+        self.books[order.stock].cancel(order)
+        return True
+
+    def depth(self, stock, side, levels=5):
+        live = self.books[stock].live[side]
+        result = []
+        for price in sorted(live, reverse=side == "buy"):
+            quantity = live[price][0]
+            if quantity:
+                result.append((price, quantity))
+                if len(result) == levels:
+                    break
+        return result
+
+
+# Per-stock {"bought": n, "sold": n} from fills: every filled share is one
+# share bought and one sold, the same way separate transactions count today
+def fill_totals(fills):
+    totals = {}
+    for fill in fills:
+        stock_totals = totals.setdefault(fill.stock, {"bought": 0, "sold": 0})
+        stock_totals["bought"] += fill.quantity
+        stock_totals["sold"] += fill.quantity
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Order book throughput benchmark")
+    parser.add_argument("--orders", type=int, default=500000)
+    parser.add_argument("--stocks", type=int, default=50)
+    parser.add_argument("--cancel-rate", type=float, default=0.3)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    stocks = [f"stock{i}" for i in range(args.stocks)]
+    mids = {stock: rng.uniform(50, 2000) for stock in stocks}
+    orders = []
+    for _ in range(args.orders):
+        stock = rng.choice(stocks)
+        side = rng.choice(("buy", "sell"))
+        # Prices around the mid in whole-Berry ticks, so orders share levels and cross
+        offset = rng.randint(-20, 20)
+        orders.append((stock, side, max(1, round(mids[stock]) + offset), rng.randint(1, 50)))
+
+    engine = MatchingEngine(stocks)
+    fill_count = 0
+    cancels = 0
+    start = time.perf_counter()
+    for i in range(0, len(orders), args.batch):
+        ids, fills = engine.place_batch(orders[i:i + args.batch])
+        fill_count += len(fills)
+        for order_id in ids:
+            if rng.random() < args.cancel_rate and engine.cancel(order_id):
+                cancels += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.orders} orders, {fill_count} fills, {cancels} cancels in {elapsed:.2f}s")
+    print(f"{args.orders / elapsed:,.0f} orders/s ({elapsed / args.orders * 1e6:.2f}us per order)")
@@ -0,0 +1,113 @@
+from trials import load_trial
+
+# Live "projected price" while the market is open. Each stock keeps running
+# buy/sell totals for the current chapter; a trade (or a retraction of one, for
+# cancels and refunds) adjusts the totals and recomputes that stock's price with
+# the 3.py calculate_price_update, so each event costs O(1) regardless of how
+# many trades came before. At chapter close the projected prices become the
+# real ones, the same result as running 3.py on the chapter totals.
+
+three = load_trial(3)
+
+
+class LivePricePreview:
+    def __init__(self, stocks, **params):
+        # stocks: name -> (current_price, circulation)
+        self.params = params
+        self.price = {name: price for name, (price, _) in stocks.items()}
+        self.circulation = {name: circulation for name, (_, circulation) in stocks.items()}
+        self.bought = dict.fromkeys(stocks, 0)
+        self.sold = dict.fromkeys(stocks, 0)
+        self.projected = dict(self.price)
+        self.trades = {}  # trade_id -> (stock, type, quantity), cleared each chapter
+        self.trade_ids = {}  # (stock, type, quantity) -> {trade_id: None}, in the order they were added
+
+    def _apply(self, stock, type, quantity):
+        if stock not in self.price:
+            raise KeyError(f"Unknown stock '{stock}'")
+        if type == "buy":
+            totals = self.bought
+        elif type == "sell":
+            totals = self.sold
+        else:
+            raise ValueError(f"Unknown trade type '{type}'")
+        if totals[stock] + quantity < 0:
+            raise ValueError(f"Retracting more {type}s of '{stock}' than were recorded")
+        totals[stock] += quantity
+
+        self.projected[stock] = three.calculate_price_update(
+            self.price[stock], self.circulation[stock], self.bought[stock], self.sold[stock], **self.params
+        )
+        return self.projected[stock]
+
+    # Returns the stock's new projected price
+    def add_trade(self, stock, type, quantity, trade_id=None):
+        if trade_id is not None:
+            if trade_id in self.trades:
+                raise ValueError(f"Trade '{trade_id}' was already recorded")
+            self.trades[trade_id] = (stock, type, quantity)
+            self.trade_ids.setdefault((stock, type, quantity), {})[trade_id] = None
+        return self._apply(stock, type, quantity)
+
+    # Undo a trade, either by the id it was added with or by its details. Retracting
+    # by details also forgets the newest recorded trade with those details, so it
+    # can't be retracted a second time by its id.
+    def retract_trade(self, trade_id=None, stock=None, type=None, quantity=None):
+        if trade_id is not None:
+            stock, type, quantity = self.trades[trade_id]
+        else:
+            ids = self.trade_ids.get((stock, type, quantity))
+            trade_id = next(reversed(ids)) if ids else None
+        price = self._apply(stock, type, -quantity)
+        if trade_id is not None:
+            self._forget(trade_id)
+        return price
+
+    def _forget(self, trade_id):
+        details = self.trades.pop(trade_id)
+        ids = self.trade_ids[details]
+        del ids[trade_id]
+        if not ids:
+            del self.trade_ids[details]
+
+    def projected_price(self, stock):
+        return self.projected[stock]
+
+    def projected_change(self, stock):
+        return (self.projected[stock] - self.price[stock]) / self.price[stock] * 100
+
+    # Make the projected prices final and start a new chapter
+    def close_chapter(self):
+        for stock in self.price:
+            self.price[stock] = self.projected[stock]
+            self.circulation[stock] += self.bought[stock] - self.sold[stock]
+            self.bought[stock] = 0
+            self.sold[stock] = 0
+        self.trades.clear()
+        self.trade_ids.clear()
+        return dict(self.price)
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    # Check against 3.py on chapter totals and time the per-trade cost
+    rng = random.Random(0)
+    stocks = {f"stock{i}": (rng.uniform(10, 2000), rng.randint(1, 500)) for i in range(50)}
+    preview = LivePricePreview(stocks)
+
+    events = 200000
+    start = time.perf_counter()
+    for trade_id in range(events):
+        preview.add_trade(f"stock{rng.randrange(50)}", rng.choice(("buy", "sell")), rng.randint(1, 20), trade_id)
+        if trade_id % 10 == 0:
+            preview.retract_trade(trade_id)  # cancelled
+    elapsed = time.perf_counter() - start
+
+    expected = {
+        stock: three.calculate_price_update(price, circulation, preview.bought[stock], preview.sold[stock])
+        for stock, (price, circulation) in stocks.items()
+    }
+    assert preview.close_chapter() == expected
+    print(f"{events} trades: {elapsed / events * 1e6:.2f}us per trade, matches 3.py on chapter totals")
@@ -0,0 +1,152 @@
+import bisect
+import json
+import math
+import time
+
+from trials import load_trial
+
+# Opt-in per-stage instrumentation for the price models. 1.py, 2.py and 3.py
+# each have a module-level `profiler` that is None unless enable() sets it;
+# with it off, every hook in the models is a single `is not None` check.
+# When on, the models report the time spent in each stage (volume impact,
+# dampener, clamp, circulation, ...), how often the caps fire, and the values of
+# intermediates like volume_ratio and buy_pressure, bucketed into histograms.
+
+# Bucket edges per recorded value; anything else gets signed log-scale buckets
+HISTOGRAM_EDGES = {
+    "buy_pressure": [-1 + i * 0.1 for i in range(21)],
+    "sell_ratio": [i * 0.1 for i in range(11)],
+    "volume_ratio": [0, 0.01, 0.1, 0.25, 0.5, 1, 2, 5, 10, 100],
+    "price_dampener": [i * 0.1 for i in range(11)],
+    "drop_multiplier": [1, 1.1, 1.2, 1.3, 1.4, 1.5],
+}
+LOG_EDGES = [-(10.0 ** e) for e in range(6, -3, -1)] + [0] + [10.0 ** e for e in range(-2, 7)]
+
+
+class Histogram:
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)  # plus underflow and overflow buckets
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+        self.total += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def buckets(self):
+        bounds = [-math.inf] + list(self.edges) + [math.inf]
+        return [(bounds[i], bounds[i + 1], count) for i, count in enumerate(self.counts) if count]
+
+
+def _finite(bound):
+    return bound if math.isfinite(bound) else None
+
+
+class Profiler:
+    def __init__(self):
+        self.stage_time = {}  # stage -> total seconds
+        self.stage_calls = {}
+        self.hits = {}  # event (e.g. a cap firing) -> count
+        self.histograms = {}
+
+    clock = staticmethod(time.perf_counter)
+
+    # Close a stage that started at `started`; returns the start of the next one
+    def lap(self, stage, started, **values):
+        now = time.perf_counter()
+        self.stage_time[stage] = self.stage_time.get(stage, 0.0) + (now - started)
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+        for name, value in values.items():
+            self.record(f"{stage.split(':')[0]}:{name}", name, value)
+        return time.perf_counter()
+
+    def record(self, key, name, value):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(HISTOGRAM_EDGES.get(name, LOG_EDGES))
+        histogram.add(value)
+
+    def hit(self, event):
+        self.hits[event] = self.hits.get(event, 0) + 1
+
+    def report(self):
+        return {
+            "stages": {
+                stage: {
+                    "calls": self.stage_calls[stage],
+                    "total_seconds": seconds,
+                    "mean_ns": seconds / self.stage_calls[stage] * 1e9,
+                }
+                for stage, seconds in self.stage_time.items()
+            },
+            "hits": dict(self.hits),
+            "histograms": {
+                key: {"count": histogram.total, "min": histogram.min, "max": histogram.max,
+                      # open-ended first/last buckets get null bounds, json would write inf as the non-standard Infinity
+                      "buckets": [[_finite(low), _finite(high), count] for low, high, count in histogram.buckets()]}
+                for key, histogram in self.histograms.items()
+            },
+        }
+
+    def format_report(self):
+        lines = [f"{'stage':40} {'calls':>10} {'total ms':>10} {'mean ns':>10}", "-" * 73]
+        for stage, stats in self.report()["stages"].items():
+            lines.append(f"{stage:40} {stats['calls']:10} {stats['total_seconds'] * 1e3:10.2f} {stats['mean_ns']:10.0f}")
+        if self.hits:
+            lines += ["", f"{'event':40} {'count':>10}", "-" * 51]
+            lines += [f"{event:40} {count:10}" for event, count in self.hits.items()]
+        for key, histogram in self.histograms.items():
+            lines += ["", f"{key} (n={histogram.total}, min={histogram.min:.4g}, max={histogram.max:.4g})"]
+            for low, high, count in histogram.buckets():
+                lines.append(f"  [{low:>9.4g}, {high:>9.4g})  {count:10}  {'#' * round(40 * count / histogram.total)}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+
+# Turn the hooks on in the given trial scripts (default: all three)
+def enable(numbers=(1, 2, 3)):
+    profiler = Profiler()
+    for number in numbers:
+        load_trial(number).profiler = profiler
+    return profiler
+
+
+def disable(numbers=(1, 2, 3)):
+    for number in numbers:
+        load_trial(number).profiler = None
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="Profile the price models on random chapters")
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    one, two, three = load_trial(1), load_trial(2), load_trial(3)
+    rng = random.Random(0)
+    inputs = [(rng.uniform(10, 5000), rng.randint(0, 2000), rng.randint(0, 500), rng.randint(0, 500)) for _ in range(args.calls)]
+
+    profiler = enable()
+    for price, circulation, bought, sold in inputs:
+        three.calculate_price_update(price, circulation, bought, sold)
+        stock = two.Stock("stock", price, circulation)
+        stock.bought_this_chap, stock.sold_this_chap = bought, sold
+        stock.update_price()
+    market = {f"stock{i}": {"price": price, "bought": bought, "sold": sold, "baseline": price * 100}
+              for i, (price, _, bought, sold) in enumerate(inputs)}
+    one.update_stock_prices(market)
+    disable()
+
+    print(profiler.format_report())
+    if args.output:
+        profiler.save(args.output)
@@ -0,0 +1,159 @@
+import argparse
+import csv
+import json
+import sys
+
+from simulate import STARTING_STOCKS
+from trials import load_trial
+
+# Non-interactive replacement for the input() prompts in 1.py and 2.py. Chapter
+# activity is read as a stream of rows
+#     chapter, stock, bought, sold
+# (CSV with that header, or JSONL objects with those keys) from files or stdin.
+# Rows must be grouped by chapter; when the chapter number changes the previous
+# chapter is closed with the chosen model and its prices are written out right
+# away, so memory stays proportional to the number of stocks, not chapters.
+
+one = load_trial(1)
+two = load_trial(2)
+three = load_trial(3)
+
+
+# Starting state per model, same characters and prices as the scripts use. The
+# circulation-based models start from simulate.py's nonzero circulations: from 0
+# the gpt model divides by ~0 and the first traded chapter explodes.
+def default_stocks(model):
+    if model == "1":
+        return [
+            {"name": name, "price": data["price"], "circulation": 0, "baseline": data["baseline"]}
+            for name, data in one.stocks.items()
+        ]
+    return [{"name": name, "price": price, "circulation": circulation} for name, price, circulation in STARTING_STOCKS]
+
+
+def read_stocks(path):
+    stocks = []
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            stock = {"name": row["name"], "price": float(row["price"]), "circulation": float(row.get("circulation") or 0)}
+            if row.get("baseline"):
+                stock["baseline"] = float(row["baseline"])
+            stocks.append(stock)
+    return stocks
+
+
+class Market:
+    def __init__(self, model, stocks):
+        self.model = model
+        if model == "1":
+            self.state = {
+                stock["name"]: {"price": stock["price"], "bought": 0, "sold": 0, "baseline": stock.get("baseline", stock["price"] * 100)}
+                for stock in stocks
+            }
+        else:
+            if model == "gpt":
+                empty = [f"{stock['circulation']:g} for {stock['name']}" for stock in stocks if stock["circulation"] <= 0]
+                if empty:
+                    raise ValueError(f"The gpt model needs a positive starting circulation (got {', '.join(empty)})")
+            self.state = {stock["name"]: two.Stock(stock["name"], stock["price"], stock["circulation"]) for stock in stocks}
+
+    def record(self, name, bought, sold):
+        if name not in self.state:
+            raise ValueError(f"Unknown stock '{name}'")
+        if self.model == "1":
+            self.state[name]["bought"] += bought
+            self.state[name]["sold"] += sold
+        else:
+            self.state[name].bought_this_chap += bought
+            self.state[name].sold_this_chap += sold
+
+    # Closes the chapter and yields (stock, price, percent_change, circulation)
+    def close_chapter(self):
+        if self.model == "1":
+            old_prices = {name: data["price"] for name, data in self.state.items()}
+            one.update_stock_prices(self.state)
+            for name, data in self.state.items():
+                data["bought"] = data["sold"] = 0
+                yield name, data["price"], (data["price"] - old_prices[name]) / old_prices[name] * 100, None
+            return
+
+        for name, stock in self.state.items():
+            if self.model == "gpt":
+                percent_change = stock.update_price()
+            else:
+                price_fn = two.calculate_price_update if self.model == "2" else three.calculate_price_update
+                old_price = stock.price
+                stock.price = price_fn(stock.price, stock.circulation, stock.bought_this_chap, stock.sold_this_chap)
+                stock.circulation += stock.bought_this_chap - stock.sold_this_chap
+                stock.bought_this_chap = stock.sold_this_chap = 0
+                percent_change = (stock.price - old_price) / old_price * 100
+            yield name, stock.price, percent_change, stock.circulation
+
+
+def read_activity(files, input_format):
+    for file in files:
+        path = getattr(file, "name", "")
+        is_csv = input_format == "csv" or (input_format is None and path.endswith(".csv"))
+        if is_csv:
+            for row in csv.DictReader(file):
+                yield int(row["chapter"]), row["stock"], float(row["bought"] or 0), float(row["sold"] or 0)
+        else:
+            for line in file:
+                if line.strip():
+                    row = json.loads(line)
+                    yield int(row["chapter"]), row["stock"], float(row.get("bought", 0)), float(row.get("sold", 0))
+
+
+def run(market, activity, write):
+    chapter = None
+    for row_chapter, name, bought, sold in activity:
+        if chapter is not None and row_chapter != chapter:
+            write(chapter, market.close_chapter())
+        chapter = row_chapter
+        market.record(name, bought, sold)
+    if chapter is not None:
+        write(chapter, market.close_chapter())
+
+
+def csv_writer(out):
+    writer = csv.writer(out)
+    writer.writerow(["chapter", "stock", "price", "percent_change", "circulation"])
+
+    def write(chapter, results):
+        for name, price, percent_change, circulation in results:
+            writer.writerow([chapter, name, f"{price:.6f}", f"{percent_change:.6f}", "" if circulation is None else circulation])
+        out.flush()
+    return write
+
+
+def jsonl_writer(out):
+    def write(chapter, results):
+        for name, price, percent_change, circulation in results:
+            out.write(json.dumps({"chapter": chapter, "stock": name, "price": price, "percent_change": percent_change, "circulation": circulation}) + "\n")
+        out.flush()
+    return write
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stocktrials price model over chapter activity without prompts")
+    parser.add_argument("inputs", nargs="*", type=argparse.FileType("r"), default=[sys.stdin],
+                        help="activity files (.csv or .jsonl), '-' or nothing for stdin")
+    parser.add_argument("--model", choices=("1", "2", "gpt", "3"), default="gpt",
+                        help="1.py, 2.py calculate_price_update, 2.py Stock (gpt), or 3.py")
+    parser.add_argument("--stocks", help="CSV of name,price,circulation[,baseline] (default: the script's stocks)")
+    parser.add_argument("--input-format", choices=("csv", "jsonl"), help="needed for stdin if not JSONL")
+    parser.add_argument("--output-format", choices=("csv", "jsonl"), default="csv")
+    args = parser.parse_args()
+
+    stocks = read_stocks(args.stocks) if args.stocks else default_stocks(args.model)
+
+    try:
+        market = Market(args.model, stocks)
+        write = csv_writer(sys.stdout) if args.output_format == "csv" else jsonl_writer(sys.stdout)
+        run(market, read_activity(args.inputs, args.input_format), write)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from trials import load_trial
+
+# Headless Monte Carlo runs of the 2.py market: each scenario plays a number of
+# chapters with randomly drawn buys/sells through Stock.update_price
+# (gpt_calculate_price_update), and scenarios are spread over a process pool.
+
+Stock = load_trial(2).Stock
+
+# Same characters and prices as main() in 2.py. They start with a circulation of
+# 50 (the backend's default baseQuantity) rather than 0, which would make the
+# first chapter's circulation factor explode.
+STARTING_STOCKS = [
+    ("Luffy", 1000, 50),
+    ("Shanks", 500, 50),
+    ("Kaido", 250, 50),
+    ("Buggy", 50, 50),
+    ("Kidd", 10, 50),
+]
+
+PRICE_FLOOR = 0.01  # gpt_calculate_price_update never goes below 1 cent
+
+DISTRIBUTIONS = ("poisson", "lognormal", "uniform")
+
+
+def draw_volumes(rng, distribution, mean_volume, size):
+    if distribution == "poisson":
+        return rng.poisson(mean_volume, size).astype(np.float64)
+    if distribution == "lognormal":
+        # sigma of 1 with the mean kept at mean_volume
+        return np.floor(rng.lognormal(np.log(mean_volume) - 0.5, 1.0, size))
+    if distribution == "uniform":
+        return np.floor(rng.uniform(0, 2 * mean_volume, size))
+    raise ValueError(f"Unknown distribution '{distribution}'")
+
+
+# Per stock: largest fall from a running peak, as a fraction of that peak
+def max_drawdown(prices):
+    peaks = np.maximum.accumulate(prices, axis=0)
+    return np.max((peaks - prices) / peaks, axis=0)
+
+
+def run_scenario(seed_seq, chapters, distribution, mean_volume, starting_stocks=STARTING_STOCKS):
+    rng = np.random.default_rng(seed_seq)
+    stocks = [Stock(name, price, circulation) for name, price, circulation in starting_stocks]
+    n = len(stocks)
+
+    # Draw the whole scenario up front, one row per chapter. Plain floats keep
+    # the scalar math in Stock.update_price off numpy's slower scalar types.
+    bought = draw_volumes(rng, distribution, mean_volume, (chapters, n)).tolist()
+    sold = draw_volumes(rng, distribution, mean_volume, (chapters, n)).tolist()
+
+    prices = np.empty((chapters + 1, n), dtype=np.float64)
+    prices[0] = [stock.price for stock in stocks]
+    for chapter in range(chapters):
+        for i, stock in enumerate(stocks):
+            # Can't sell more than is held, so circulation never goes negative
+            stock.bought_this_chap = bought[chapter][i]
+            stock.sold_this_chap = min(sold[chapter][i], stock.circulation + bought[chapter][i])
+            stock.update_price()
+            prices[chapter + 1, i] = stock.price
+
+    return {
+        "prices": prices.astype(np.float32),  # compact path, float32 is plenty for plotting/stats
+        "max_drawdown": max_drawdown(prices),
+        "chapters_at_floor": np.count_nonzero(prices[1:] <= PRICE_FLOOR, axis=0),
+        "circulation_drift": np.array([stock.circulation for stock in stocks], dtype=np.float64)
+        - np.array([circulation for _, _, circulation in starting_stocks], dtype=np.float64),
+    }
+
+
+# Worker task: a chunk of scenarios per submit keeps pickling overhead down
+def _run_chunk(seed_seqs, chapters, distribution, mean_volume, starting_stocks):
+    return [run_scenario(seed_seq, chapters, distribution, mean_volume, starting_stocks) for seed_seq in seed_seqs]
+
+
+def simulate(scenarios, chapters, distribution="poisson", mean_volume=50, seed=0,
+             workers=None, chunk_size=64, starting_stocks=STARTING_STOCKS):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{distribution}'")
+
+    seed_seqs = np.random.SeedSequence(seed).spawn(scenarios)
+    chunks = [seed_seqs[i:i + chunk_size] for i in range(0, scenarios, chunk_size)]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_chunk, chunk, chapters, distribution, mean_volume, starting_stocks)
+            for chunk in chunks
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+# Stats across all scenarios, one entry per stock
+def summarize(results, starting_stocks=STARTING_STOCKS):
+    drawdowns = np.stack([result["max_drawdown"] for result in results])
+    at_floor = np.stack([result["chapters_at_floor"] for result in results])
+    drift = np.stack([result["circulation_drift"] for result in results])
+    final_prices = np.stack([result["prices"][-1] for result in results])
+
+    summary = {}
+    for i, (name, _, _) in enumerate(starting_stocks):
+        summary[name] = {
+            "median_final_price": float(np.median(final_prices[:, i])),
+            "mean_max_drawdown": float(drawdowns[:, i].mean()),
+            "worst_max_drawdown": float(drawdowns[:, i].max()),
+            "mean_chapters_at_floor": float(at_floor[:, i].mean()),
+            "mean_circulation_drift": float(drift[:, i].mean()),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of the 2.py market")
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--chapters", type=int, default=50)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="poisson")
+    parser.add_argument("--mean-volume", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    results = simulate(args.scenarios, args.chapters, args.distribution, args.mean_volume, args.seed, args.workers)
+
+    print(f"\n{args.scenarios} scenarios x {args.chapters} chapters ({args.distribution}, mean volume {args.mean_volume})")
+    print("----------------------------------------")
+    for name, stats in summarize(results).items():
+        print(
+            f"{name:10} median final: {stats['median_final_price']:12.2f}  "
+            f"drawdown avg/worst: {stats['mean_max_drawdown']:6.1%}/{stats['worst_max_drawdown']:6.1%}  "
+            f"at floor: {stats['mean_chapters_at_floor']:6.2f} ch  "
+            f"circ drift: {stats['mean_circulation_drift']:+9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from batch import batch_asymmetric_price_update, fast_forward
+from simulate import STARTING_STOCKS, draw_volumes
+from trials import load_trial
+
+# Parameter sweeps over the pricing constants of 1.py (SENSITIVITY, C, BETA) and
+# 3.py (caps, drop multiplier threshold, floor). Every combination is replayed
+# over the same chapters and scored; evaluations run on a process pool and each
+# finished one is appended to an on-disk cache, so an interrupted or widened
+# sweep only computes what is missing.
+#
+# Replay files are JSON:
+#   {"stocks": [{"name": "Luffy", "price": 1000, "circulation": 50}, ...],
+#    "chapters": [{"bought": [...], "sold": [...], "prices": [...]}, ...]}
+# with one entry per stock in each list. "prices" (the real prices after that
+# chapter) is optional and only needed for the tracking score.
+
+one = load_trial(1)
+three = load_trial(3)
+
+# Search ranges for --random, defaults are the values in the scripts
+SWEEP_PARAMS = {
+    "1": {
+        "sensitivity": ((0.01, 0.5), one.SENSITIVITY),
+        "c": ((0.05, 1.0), one.C),
+        "beta": ((0.05, 0.95), one.BETA),
+    },
+    "3": {
+        "max_change": ((100, 600), three.MAX_CHANGE),
+        "cap_price_scale": ((10, 200), three.CAP_PRICE_SCALE),
+        "dampener_price_scale": ((20, 400), three.DAMPENER_PRICE_SCALE),
+        "drop_threshold": ((0.3, 0.9), three.DROP_THRESHOLD),
+        "drop_cap_factor": ((1.0, 2.0), three.DROP_CAP_FACTOR),
+        "price_floor": ((1, 50), three.PRICE_FLOOR),
+    },
+}
+
+SCORES = ("stability", "tracking")
+FLOOR_PENALTY = 1.0  # stability score added per unit fraction of stock-chapters at the floor
+
+
+def synthetic_replay(chapters=30, seed=0, mean_volume=50):
+    rng = np.random.default_rng(seed)
+    n = len(STARTING_STOCKS)
+    bought = draw_volumes(rng, "poisson", mean_volume, (chapters, n))
+    sold = draw_volumes(rng, "poisson", mean_volume, (chapters, n))
+    return {
+        "stocks": [{"name": name, "price": price, "circulation": circulation} for name, price, circulation in STARTING_STOCKS],
+        "chapters": [{"bought": b, "sold": s} for b, s in zip(bought.tolist(), sold.tolist())],
+    }
+
+
+# Price path (chapters + 1, stocks) for one parameter combination
+def replay_prices(model, params, replay):
+    stocks = replay["stocks"]
+    path = [[stock["price"] for stock in stocks]]
+
+    if model == "1":
+        # 1.py has no circulation; its baseline starts at price * 100 like the stocks table there
+        market = {
+            stock["name"]: {"price": stock["price"], "bought": 0, "sold": 0, "baseline": stock.get("baseline", stock["price"] * 100)}
+            for stock in stocks
+        }
+        for chapter in replay["chapters"]:
+            for stock, bought, sold in zip(stocks, chapter["bought"], chapter["sold"]):
+                market[stock["name"]]["bought"] = bought
+                market[stock["name"]]["sold"] = sold
+            one.update_stock_prices(market, **params)
+            path.append([market[stock["name"]]["price"] for stock in stocks])
+    elif model == "3":
+        bought = [chapter["bought"] for chapter in replay["chapters"]]
+        sold = [chapter["sold"] for chapter in replay["chapters"]]
+        circulations = [stock["circulation"] for stock in stocks]
+        prices, _ = fast_forward(path[0], circulations, bought, sold, batch_asymmetric_price_update, **params)
+        return prices
+    else:
+        raise ValueError(f"Unknown model '{model}'")
+
+    return np.array(path, dtype=np.float64)
+
+
+# Lower is better for both scores
+def score_path(path, replay, score, price_floor):
+    if score == "stability":
+        # mean absolute log return, plus a penalty for time spent on the floor
+        safe = np.maximum(path, 1e-9)
+        volatility = np.mean(np.abs(np.diff(np.log(safe), axis=0)))
+        at_floor = np.mean(path[1:] <= price_floor)
+        return float(volatility + FLOOR_PENALTY * at_floor)
+    if score == "tracking":
+        # RMS log error against the real prices recorded in the replay
+        targets = np.array([chapter["prices"] for chapter in replay["chapters"]], dtype=np.float64)
+        errors = np.log(np.maximum(path[1:], 1e-9) / targets)
+        return float(np.sqrt(np.mean(errors ** 2)))
+    raise ValueError(f"Unknown score '{score}'")
+
+
+_replay = None
+
+def _init_worker(replay):
+    global _replay
+    _replay = replay
+
+
+def evaluate(model, params, score):
+    path = replay_prices(model, params, _replay)
+    price_floor = params.get("price_floor", three.PRICE_FLOOR) if model == "3" else 0
+    return score_path(path, _replay, score, price_floor)
+
+
+def cache_key(model, params, score, replay_digest):
+    blob = json.dumps({"model": model, "params": params, "score": score, "replay": replay_digest}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def load_cache(cache_path):
+    cache = {}
+    if os.path.isfile(cache_path):
+        with open(cache_path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # last line of an interrupted run
+                cache[entry["key"]] = entry
+    return cache
+
+
+def grid_combinations(model, grid):
+    names = list(grid)
+    # floats throughout so 300 and 300.0 share a cache entry
+    defaults = {name: float(default) for name, (_, default) in SWEEP_PARAMS[model].items()}
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield {**defaults, **dict(zip(names, values))}
+
+
+def random_combinations(model, count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {name: rng.uniform(low, high) for name, ((low, high), _) in SWEEP_PARAMS[model].items()}
+
+
+def sweep(model, combinations, replay, score="stability", cache_path="sweep_cache.jsonl", workers=None):
+    replay_digest = hashlib.sha256(json.dumps(replay, sort_keys=True).encode()).hexdigest()
+    cache = load_cache(cache_path)
+
+    results = []
+    pending = {}
+    for params in combinations:
+        key = cache_key(model, params, score, replay_digest)
+        if key in cache:
+            results.append(cache[key])
+        else:
+            pending[key] = params
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(replay,)) as pool, \
+                open(cache_path, "a") as cache_file:
+            futures = {pool.submit(evaluate, model, params, score): key for key, params in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                entry = {"key": key, "model": model, "score_type": score, "params": pending[key], "score": future.result()}
+                # One line per finished evaluation, flushed so an interrupt loses nothing
+                cache_file.write(json.dumps(entry) + "\n")
+                cache_file.flush()
+                results.append(entry)
+
+    return sorted(results, key=lambda entry: entry["score"]), len(pending)
+
+
+def parse_grid(model, specs):
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in SWEEP_PARAMS[model]:
+            raise SystemExit(f"Unknown parameter '{name}' for model {model}, expected one of: {', '.join(SWEEP_PARAMS[model])}")
+        grid[name] = [float(value) for value in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep pricing constants over replayed chapters")
+    parser.add_argument("--model", choices=SWEEP_PARAMS, default="3", help="1 = 1.py, 3 = 3.py")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=V1,V2", help="grid values per parameter")
+    parser.add_argument("--random", type=int, metavar="N", help="sample N random combinations instead of a grid")
+    parser.add_argument("--replay", help="replay JSON file (default: synthetic chapters)")
+    parser.add_argument("--score", choices=SCORES, default="stability")
+    parser.add_argument("--cache", default="sweep_cache.jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay) as file:
+            replay = json.load(file)
+    else:
+        replay = synthetic_replay(seed=args.seed)
+    # Checked here, a missing key would otherwise only surface as a KeyError in a worker
+    if args.score == "tracking" and not all("prices" in chapter for chapter in replay["chapters"]):
+        source = f"'{args.replay}'" if args.replay else "the synthetic replay (pass --replay)"
+        parser.error(f"--score tracking needs \"prices\" in every chapter of the replay, missing from {source}")
+
+    if args.random:
+        combinations = random_combinations(args.model, args.random, args.seed)
+    else:
+        combinations = grid_combinations(args.model, parse_grid(args.model, args.grid))
+
+    results, computed = sweep(args.model, combinations, replay, args.score, args.cache, args.workers)
+    print(f"{len(results)} combinations ({computed} computed, {len(results) - computed} from cache)\n")
+    for entry in results[:args.top]:
+        params = "  ".join(f"{name}={value:g}" for name, value in entry["params"].items())
+        print(f"{entry['score']:10.5f}  {params}")
+
+
+if __name__ == "__main__":
+    main()
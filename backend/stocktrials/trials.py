@@ -0,0 +1,17 @@
+import importlib.util
+import os
+
+# The trial scripts are named 1.py, 2.py, 3.py so they can't be imported with a
+# plain import statement; load them from their file paths instead.
+STOCKTRIALS_DIR = os.path.realpath(os.path.dirname(__file__))
+
+_loaded = {}
+
+def load_trial(number):
+    if number not in _loaded:
+        path = f"{STOCKTRIALS_DIR}/{number}.py"
+        spec = importlib.util.spec_from_file_location(f"stocktrials_{number}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[number] = module
+    return _loaded[number]
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import json
+import os
+
+# Streaming version of totalBuySellsForChapter (backend/src/utils/stockStats.utils.js)
+# for exported Transaction logs. Rows are read one at a time and folded into
+# per-chapter, per-stock buy/sell counters, and the byte offset reached is saved
+# in a checkpoint so the next run only reads rows appended since.
+#
+# Supported exports: JSONL (one document per line, mongoexport style, relaxed or
+# canonical Extended JSON) and CSV with a header row. Both need the stockID, type, quantity and chapterPurchasedAt fields.
+
+CHECKPOINT_EVERY = 100000  # rows between checkpoint writes while consuming
+
+
+def _stock_id(value):
+    # mongoexport writes ObjectIds as {"$oid": "..."}
+    if isinstance(value, dict):
+        return value["$oid"]
+    return str(value)
+
+
+# Canonical Extended JSON (mongoexport --jsonFormat=canonical) wraps every
+# number: {"$numberInt": "3"}, {"$numberLong": "..."}, {"$numberDouble": "1.5"}
+NUMBER_WRAPPERS = ("$numberInt", "$numberLong", "$numberDouble", "$numberDecimal")
+
+
+def _number(value):
+    if isinstance(value, dict):
+        for wrapper in NUMBER_WRAPPERS:
+            if wrapper in value:
+                return value[wrapper]
+        raise ValueError(f"Unsupported number value {value!r}")
+    return value
+
+
+class TransactionAggregator:
+    def __init__(self):
+        # chapter -> stockID -> [totalBuys, totalSells]
+        self.chapters = {}
+        self.offset = 0
+        self.header = None  # CSV column names, kept so a resumed run can parse rows
+        self.rows = 0
+
+    def add(self, stock_id, type, quantity, chapter):
+        counters = self.chapters.setdefault(chapter, {}).setdefault(stock_id, [0, 0])
+        if type == "buy":
+            counters[0] += quantity
+        elif type == "sell":
+            counters[1] += quantity
+        else:
+            raise ValueError(f"Unknown transaction type '{type}'")
+
+    def add_document(self, document):
+        quantity = _number(document.get("quantity"))
+        self.add(
+            _stock_id(document["stockID"]),
+            document["type"],
+            1 if quantity in (None, "") else float(quantity),  # schema default is 1
+            int(_number(document["chapterPurchasedAt"])),
+        )
+
+    # Same shape as stockStatistics' map entries, plus the net count
+    def chapter_totals(self, chapter):
+        return {
+            stock_id: {"totalBuys": buys, "totalSells": sells, "net": buys - sells}
+            for stock_id, (buys, sells) in self.chapters.get(chapter, {}).items()
+        }
+
+    def consume(self, path, checkpoint_path=None):
+        # Read in binary so the offset is an exact byte position we can seek back to
+        is_csv = path.endswith(".csv")
+        with open(path, "rb") as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # Row still being written, pick it up next run
+                    break
+                self.offset += len(line)
+                text = line.decode("utf-8").strip()
+                if not text:
+                    continue
+                if is_csv:
+                    values = next(csv.reader([text]))
+                    if self.header is None:
+                        self.header = values
+                        continue
+                    self.add_document(dict(zip(self.header, values)))
+                else:
+                    self.add_document(json.loads(text))
+                self.rows += 1
+
+                if checkpoint_path and self.rows % CHECKPOINT_EVERY == 0:
+                    self.save(checkpoint_path)
+
+        if checkpoint_path:
+            self.save(checkpoint_path)
+        return self.rows
+
+    def save(self, checkpoint_path):
+        data = {
+            "offset": self.offset,
+            "rows": self.rows,
+            "header": self.header,
+            "chapters": {
+                str(chapter): stocks for chapter, stocks in self.chapters.items()
+            },
+        }
+        # Write then rename so a crash never leaves a half-written checkpoint
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, checkpoint_path)
+
+    @classmethod
+    def load(cls, checkpoint_path):
+        aggregator = cls()
+        if os.path.isfile(checkpoint_path):
+            with open(checkpoint_path) as file:
+                data = json.load(file)
+            aggregator.offset = data["offset"]
+            aggregator.rows = data["rows"]
+            aggregator.header = data["header"]
+            aggregator.chapters = {
+                int(chapter): stocks for chapter, stocks in data["chapters"].items()
+            }
+        return aggregator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate an exported transaction log per chapter and stock")
+    parser.add_argument("log", help="transaction export (.jsonl or .csv)")
+    parser.add_argument("--checkpoint", help="checkpoint file to resume from and update")
+    parser.add_argument("--chapter", type=int, help="print totals for this chapter only")
+    args = parser.parse_args()
+
+    if args.checkpoint:
+        aggregator = TransactionAggregator.load(args.checkpoint)
+    else:
+        aggregator = TransactionAggregator()
+
+    before = aggregator.rows
+    aggregator.consume(args.log, args.checkpoint)
+    print(f"Read {aggregator.rows - before} new transactions ({aggregator.rows} total)")
+
+    chapters = [args.chapter] if args.chapter is not None else sorted(aggregator.chapters)
+    for chapter in chapters:
+        print(f"\nChapter {chapter}:")
+        print("----------------------------------------")
+        for stock_id, totals in aggregator.chapter_totals(chapter).items():
+            print(f"{stock_id:26} buys: {totals['totalBuys']:10g}  sells: {totals['totalSells']:10g}  net: {totals['net']:+10g}")
+
+
+if __name__ == "__main__":
+    main()